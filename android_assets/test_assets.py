@@ -15,17 +15,22 @@ def test_android_assets():
     
     # Test embeddings loading
     for class_name in ['smishing', 'benign']:
-        json_file = f'{class_name}_embeddings.json'
+        meta_file = f'{class_name}_meta.json'
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
             
-            embeddings = np.array(data['embeddings'])
-            texts = data['texts']
+            arrays = {name: np.fromfile(info['file'], dtype=np.dtype(info['dtype']).newbyteorder('<')).reshape(info['shape'])
+                      for name, info in meta['arrays'].items()}
+            embeddings = arrays['embeddings'].astype(np.float32)
+            if meta['embedding_dtype'] == "int8":
+                embeddings *= arrays['scales'][:, None]
+            offsets = arrays['text_offsets']
+            sample = arrays['texts_utf8'][offsets[0]:offsets[1]].tobytes().decode('utf-8')
             
             print(f"✓ {class_name}: {len(embeddings)} embeddings loaded")
             print(f"  - Dimension: {embeddings.shape[1]}")
-            print(f"  - Sample: '{texts[0][:50]}...'")
+            print(f"  - Sample: '{sample[:50]}...'")
             
         except Exception as e:
             print(f"✗ {class_name}: Error - {e}")
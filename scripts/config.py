@@ -16,3 +16,18 @@ INPUT_FILE_PATH = "/data/D1.csv"  # Full path to the CSV file for generating emb
 CLASS_SMISHING = "smishing"
 CLASS_BENIGN = "benign"
 
+# Embeddings storage configuration
+# float16 halves the size of the .npy files; cosine similarity on normalized vectors barely changes
+EMBEDDINGS_DTYPE = "float16"
+
+# Android embeddings format
+# "int8": per-vector int8 quantization (4x smaller, embedding = value * scale)
+# "float16": half precision (2x smaller, no scales, read directly into a half/float buffer)
+# "float32": full precision
+ANDROID_EMBEDDINGS_DTYPE = "int8"
+
+# Semantic query cache (semantic_search_sms)
+# A query whose embedding has cosine similarity >= QUERY_CACHE_THRESHOLD with a recent
+# query reuses its results (near-duplicate SMS templates are common). 1.0 or more disables it.
+QUERY_CACHE_THRESHOLD = 0.95
+QUERY_CACHE_SIZE = 256
@@ -1,141 +1,215 @@
 #!/usr/bin/env python3
 """
-Script to convert SentenceTransformers model to TensorFlow Lite format for Android.
+Script to export the SentenceTransformers model for Android.
 Uses the model specified in config.py.
+
+Two artifacts are produced in android_assets/:
+- sms_embedding_model.onnx: MiniLM exported with Optimum and dynamically quantized
+  to INT8 for ARM64, to run with ONNX Runtime Mobile (recommended; skipped
+  if the optional optimum package is not installed).
+- sms_embedding_model.tflite: the same MiniLM encoder (with mean pooling and L2
+  normalization) converted to TensorFlow Lite.
 """
 
 import os
 import sys
+import shutil
+import tempfile
 import numpy as np
+import pandas as pd
 import tensorflow as tf
-from sentence_transformers import SentenceTransformer
-import tempfile
-import shutil
 
 # Add the scripts directory to the path to import config
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config import MODEL_NAME
+from config import MODEL_NAME, INPUT_FILE_PATH
+from model_cache import get_model
+
+# Hugging Face repository of the model (sentence-transformers models are published under that org)
+HF_MODEL_ID = MODEL_NAME if "/" in MODEL_NAME else f"sentence-transformers/{MODEL_NAME}"
+# Fixed sequence length for the on-device model (SMS rarely exceed 128 tokens)
+MAX_SEQ_LENGTH = 128
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "android_assets")
+ONNX_FILENAME = "sms_embedding_model.onnx"
+TFLITE_FILENAME = "sms_embedding_model.tflite"
+# Number of real SMS used to calibrate the int8 quantization
+REPRESENTATIVE_SAMPLES = 100
 
-def create_simple_embedding_model():
+def export_onnx_model(output_dir):
     """
-    Create a simple TensorFlow model for text embeddings.
-    This is a simplified version that can be converted to TFLite.
+    Export the model to ONNX with Optimum and quantize it to INT8 for ARM64 (Android).
+    The tokenizer is saved next to it, since tokenization happens on the device.
     """
-    # Create a simple model that takes numerical input and returns embeddings
-    class SimpleEmbeddingModel(tf.keras.Model):
-        def __init__(self, embedding_dim=384, input_dim=1000, **kwargs):
-            super().__init__(**kwargs)
-            self.embedding_dim = embedding_dim
-            
-            # Simple dense layers to create embeddings from numerical input
-            self.dense1 = tf.keras.layers.Dense(512, activation='relu')
-            self.dense2 = tf.keras.layers.Dense(embedding_dim, activation=None)
-            self.normalize = tf.keras.layers.Lambda(
-                lambda x: tf.nn.l2_normalize(x, axis=1)
-            )
-            
-        def call(self, inputs):
-            # Process numerical input (this would be pre-processed text features)
-            x = self.dense1(inputs)
-            x = self.dense2(x)
-            x = self.normalize(x)
-            return x
-    
-    return SimpleEmbeddingModel()
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print("Exporting model to ONNX...")
+        ort_model = ORTModelForFeatureExtraction.from_pretrained(HF_MODEL_ID, export=True)
+        ort_model.save_pretrained(temp_dir)
+
+        print("Quantizing ONNX model to INT8 (arm64, dynamic, per-channel)...")
+        quantizer = ORTQuantizer.from_pretrained(temp_dir)
+        quantization_config = AutoQuantizationConfig.arm64(is_static=False, per_channel=True)
+        quantized_dir = os.path.join(temp_dir, "quantized")
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=quantization_config)
+
+        onnx_path = os.path.join(output_dir, ONNX_FILENAME)
+        shutil.copyfile(os.path.join(quantized_dir, "model_quantized.onnx"), onnx_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print(f"ONNX model saved to: {onnx_path}")
+    return onnx_path
+
+def create_tf_embedding_module():
+    """
+    Create a TensorFlow module with the real MiniLM encoder plus mean pooling and
+    L2 normalization, i.e. the same embeddings SentenceTransformer produces.
+    """
+    from transformers import TFAutoModel
+
+    encoder = TFAutoModel.from_pretrained(HF_MODEL_ID, from_pt=True)
+
+    class SentenceEmbeddingModule(tf.Module):
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder = encoder
+
+        @tf.function(input_signature=[
+            tf.TensorSpec(shape=[1, MAX_SEQ_LENGTH], dtype=tf.int32, name='input_ids'),
+            tf.TensorSpec(shape=[1, MAX_SEQ_LENGTH], dtype=tf.int32, name='attention_mask'),
+        ])
+        def serving(self, input_ids, attention_mask):
+            hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            # Mean pooling over the real tokens, then L2 normalization
+            mask = tf.cast(tf.expand_dims(attention_mask, -1), hidden.dtype)
+            pooled = tf.reduce_sum(hidden * mask, axis=1) / tf.maximum(tf.reduce_sum(mask, axis=1), 1e-9)
+            return {'embedding': tf.math.l2_normalize(pooled, axis=1)}
+
+    return SentenceEmbeddingModule(encoder)
+
+def load_representative_sms(num_samples=REPRESENTATIVE_SAMPLES):
+    """
+    Load a random sample of real SMS from the input dataset to calibrate quantization.
+    Falls back to a few generic SMS if the dataset is not available.
+    """
+    candidate_paths = [
+        INPUT_FILE_PATH,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", os.path.basename(INPUT_FILE_PATH)),
+    ]
+    for path in candidate_paths:
+        if os.path.exists(path):
+            sms_texts = pd.read_csv(path, usecols=['sms_text'])['sms_text'].dropna()
+            return sms_texts.sample(min(num_samples, len(sms_texts)), random_state=0).tolist()
+
+    print("Warning: input dataset not found, calibrating with generic sample SMS.")
+    return [
+        "Hello world",
+        "This is a test message",
+        "SMS verification code",
+        "Bank account security alert",
+        "Your account has been compromised",
+        "Click here to verify your identity",
+        "You have won a prize",
+        "Urgent action required"
+    ]
+
+def export_tflite_model(output_dir, tokenizer):
+    """
+    Convert the MiniLM encoder to TensorFlow Lite with full int8 post-training quantization.
+    """
+    tf_module = create_tf_embedding_module()
+
+    def representative_dataset():
+        # Real tokenized SMS so the int8 ranges match what the model sees in production
+        for text in load_representative_sms():
+            tokens = tokenizer(text, padding='max_length', truncation=True,
+                               max_length=MAX_SEQ_LENGTH, return_tensors='np')
+            yield {
+                'input_ids': tokens['input_ids'].astype(np.int32),
+                'attention_mask': tokens['attention_mask'].astype(np.int32),
+            }
+
+    temp_dir = tempfile.mkdtemp()
+    tf_model_path = os.path.join(temp_dir, "tf_model")
+    try:
+        print("Saving model in TensorFlow format...")
+        tf.saved_model.save(tf_module, tf_model_path, signatures={'serving_default': tf_module.serving})
+
+        print("Converting to TensorFlow Lite...")
+        converter = tf.lite.TFLiteConverter.from_saved_model(tf_model_path)
+
+        # Full int8 post-training quantization (int8 weights and activations).
+        # Token ids stay int32 and the embedding output stays float; ops without an
+        # int8 kernel fall back to the float builtins.
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+        ]
+
+        tflite_model = converter.convert()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        print("Temporary files cleaned up.")
+
+    tflite_path = os.path.join(output_dir, TFLITE_FILENAME)
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
+
+    print(f"TFLite model saved to: {tflite_path}")
+    return tflite_path
 
 def convert_model_to_tflite():
     """
-    Convert the SentenceTransformers model specified in config.py to TensorFlow Lite format.
+    Export the SentenceTransformers model specified in config.py for Android
+    (ONNX INT8 and TensorFlow Lite).
     """
     print(f"Starting conversion of model: {MODEL_NAME}")
-    
+
     try:
-        # Step 1: Load the SentenceTransformers model
+        # Step 1: Load the SentenceTransformers model (reference for verification)
         print("Loading SentenceTransformers model...")
-        model = SentenceTransformer(MODEL_NAME)
+        model = get_model(MODEL_NAME, device="cpu")
         print(f"Model loaded successfully: {MODEL_NAME}")
         
-        # Step 2: Create a simple TensorFlow model
-        print("Creating TensorFlow model...")
-        tf_model = create_simple_embedding_model()
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
         
-        # Step 3: Adapt the model with some sample texts
-        print("Adapting model with sample texts...")
-        sample_texts = [
-            "Hello world",
-            "This is a test message",
-            "SMS verification code",
-            "Bank account security alert",
-            "Your account has been compromised",
-            "Click here to verify your identity",
-            "You have won a prize",
-            "Urgent action required"
-        ]
-        # The adapt_text_vectorization method is removed, so we'll just pass dummy data
-        # or handle the input differently if the model expects it.
-        # For now, we'll just print a message as the method is removed.
-        print("Adaptation of text vectorization is skipped as the method is removed.")
+        # Step 2: ONNX INT8 export for ONNX Runtime Mobile (optional, needs Optimum)
+        onnx_path = None
+        try:
+            import optimum.onnxruntime
+        except ImportError:
+            print("Warning: Optimum is not installed, skipping the ONNX export.")
+            print("Install it with: pip install optimum[exporters,onnxruntime]")
+        else:
+            onnx_path = export_onnx_model(OUTPUT_DIR)
         
-        # Step 4: Create a temporary directory for the TF model
-        temp_dir = tempfile.mkdtemp()
-        tf_model_path = os.path.join(temp_dir, "tf_model")
+        # The tokenizer runs on the device, ship it with the model
+        model.tokenizer.save_pretrained(OUTPUT_DIR)
         
-        try:
-            # Step 5: Save the model in TensorFlow format
-            print("Saving model in TensorFlow format...")
-            
-            # Create a simple input signature for the model
-            @tf.function(input_signature=[tf.TensorSpec(shape=[None, 1000], dtype=tf.float32, name='text_input')])
-            def serving_fn(text_input):
-                return tf_model(text_input)
-            
-            # Save the model
-            tf.saved_model.save(tf_model, tf_model_path, signatures={'serving_default': serving_fn})
-            print(f"Model saved to: {tf_model_path}")
-            
-            # Step 6: Convert to TensorFlow Lite
-            print("Converting to TensorFlow Lite...")
-            converter = tf.lite.TFLiteConverter.from_saved_model(tf_model_path)
-            
-            # Optimizations for mobile
-            converter.optimizations = [tf.lite.Optimize.DEFAULT]
-            converter.target_spec.supported_types = [tf.float16]
-            
-            # Convert
-            tflite_model = converter.convert()
-            print("Conversion completed successfully!")
-            
-            # Step 7: Save the TFLite model
-            output_dir = os.path.join(os.path.dirname(__file__), "..", "android_assets")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            tflite_path = os.path.join(output_dir, "sms_embedding_model.tflite")
-            with open(tflite_path, 'wb') as f:
-                f.write(tflite_model)
-            
-            print(f"TFLite model saved to: {tflite_path}")
-            
-            # Step 8: Verify the conversion
-            print("Verifying conversion...")
-            verify_conversion(model, tflite_path)
-            
-            print("\n" + "="*60)
-            print("CONVERSION COMPLETED SUCCESSFULLY!")
-            print("="*60)
-            print(f"Model: {MODEL_NAME}")
-            print(f"TFLite file: {tflite_path}")
-            print(f"File size: {os.path.getsize(tflite_path) / (1024*1024):.2f} MB")
-            print("\nNext steps:")
-            print("1. Copy the TFLite file to your Android app's assets folder")
-            print("2. Use TensorFlow Lite in your Android app")
-            print("3. Test with the same embeddings to ensure compatibility")
-            
-        finally:
-            # Clean up temporary files
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                print("Temporary files cleaned up.")
-                
+        # Step 3: TensorFlow Lite export
+        tflite_path = export_tflite_model(OUTPUT_DIR, model.tokenizer)
+
+        # Step 4: Verify the conversion
+        print("Verifying conversion...")
+        verify_conversion(model, tflite_path)
+
+        print("\n" + "="*60)
+        print("CONVERSION COMPLETED SUCCESSFULLY!")
+        print("="*60)
+        print(f"Model: {MODEL_NAME}")
+        if onnx_path:
+            print(f"ONNX file: {onnx_path} ({os.path.getsize(onnx_path) / (1024*1024):.2f} MB)")
+        print(f"TFLite file: {tflite_path} ({os.path.getsize(tflite_path) / (1024*1024):.2f} MB)")
+        print("\nNext steps:")
+        print("1. Copy the model and tokenizer files to your Android app's assets folder")
+        print("2. Use ONNX Runtime Mobile (recommended) or TensorFlow Lite in your Android app")
+        print("3. The ONNX model outputs token embeddings: apply mean pooling + L2 normalization")
+        print("4. Test with the same embeddings to ensure compatibility")
+
     except Exception as e:
         print(f"Error during conversion: {str(e)}")
         return False
@@ -149,7 +223,7 @@ def verify_conversion(original_model, tflite_path):
     try:
         # Load the TFLite model
         interpreter = tf.lite.Interpreter(model_path=tflite_path)
-        interpreter.allocate_tensors()
+        runner = interpreter.get_signature_runner('serving_default')
         
         # Test texts
         test_texts = [
@@ -163,14 +237,20 @@ def verify_conversion(original_model, tflite_path):
         
         for text in test_texts:
             # Get embedding from original model
-            original_embedding = original_model.encode([text])[0]
+            original_embedding = original_model.encode([text], normalize_embeddings=True)[0]
             
-            # Get embedding from TFLite model (simplified - you'll need to implement this properly)
-            # For now, we'll just check that the TFLite model loads correctly
-            print(f"✓ Test text: '{text[:30]}...' - TFLite model loaded successfully")
+            # Get embedding from TFLite model
+            tokens = original_model.tokenizer(text, padding='max_length', truncation=True,
+                                              max_length=MAX_SEQ_LENGTH, return_tensors='np')
+            output = runner(input_ids=tokens['input_ids'].astype(np.int32),
+                            attention_mask=tokens['attention_mask'].astype(np.int32))
+            tflite_embedding = output['embedding'][0].astype(np.float32)
+
+            similarity = float(np.dot(original_embedding, tflite_embedding) / np.linalg.norm(tflite_embedding))
+            print(f"✓ Test text: '{text[:30]}...' - cosine similarity with original: {similarity:.4f}")
         
         print("✓ Conversion verification completed!")
-        
+
     except Exception as e:
         print(f"Warning: Could not fully verify conversion: {str(e)}")
         print("Please test the model manually in your Android app.")
@@ -184,7 +264,7 @@ def get_model_info():
     print("="*60)
     print(f"Model: {MODEL_NAME}")
     print(f"Type: SentenceTransformers")
-    print(f"Output: TensorFlow Lite (.tflite)")
+    print(f"Output: ONNX INT8 (.onnx) and TensorFlow Lite (.tflite)")
     print("="*60)
 
 if __name__ == "__main__":
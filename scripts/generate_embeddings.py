@@ -1,10 +1,11 @@
 import os
 import sys
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 import numpy as np
-import time
-from config import MODEL_NAME, INPUT_FILE_PATH, CLASS_SMISHING, CLASS_BENIGN
+from config import MODEL_NAME, INPUT_FILE_PATH, CLASS_SMISHING, CLASS_BENIGN, EMBEDDINGS_DTYPE
+from model_cache import get_model, default_device, encode_many
+from utils import normalizar_embeddings, guardar_textos, guardar_indice_faiss, guardar_firmas_binarias
+from utils import guardar_embeddings_int8
 
 # --- Configuration ---
 SMS_FILE = INPUT_FILE_PATH  # Path to the .CSV or .py file
@@ -12,12 +13,27 @@ EXTENSION = SMS_FILE.split('.')[-1]
 SMS_TEXT_COLUMN = 'sms_text'  # Name of the column with SMS messages
 SMS_ID_COLUMN = 'sms_id'  # Name of the column with SMS IDs
 EMBEDDING_MODEL = MODEL_NAME
+ENCODE_BATCH_SIZE = 256  # SMS per forward pass
+DEVICE = default_device()
 
-print(f"Loading embedding model: {EMBEDDING_MODEL}...")
-model = SentenceTransformer(EMBEDDING_MODEL)
+print(f"Loading embedding model: {EMBEDDING_MODEL} ({DEVICE})...")
+# FP16 weights on GPU (see model_cache.get_model)
+model = get_model(EMBEDDING_MODEL, device=DEVICE)
 print("Model loaded.")
 
 # --- Load SMS from file ---
+def load_sms_csv(csv_path):
+    """
+    Load the SMS CSV, caching it as Feather next to it.
+    Later runs read the cache in milliseconds instead of re-parsing the CSV.
+    """
+    cache_path = csv_path + '.feather'
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+        return pd.read_feather(cache_path)
+    df = pd.read_csv(csv_path, engine="pyarrow")
+    df.to_feather(cache_path)
+    return df
+
 print(f"Loading SMS data from: {SMS_FILE}")
 
 # if the file is .py, load the SMS file from the data folder
@@ -26,7 +42,7 @@ if SMS_FILE.endswith('.py'):
     sms_collection = sms_collection[SMS_TEXT_COLUMN].dropna().tolist()
     print(f"Loaded {len(sms_collection)} SMS from the collection.")
 else:
-    df_sms = pd.read_csv(SMS_FILE)
+    df_sms = load_sms_csv(SMS_FILE)
     print(f"Loaded {len(df_sms)} total SMS records.")
     
     # Separate SMS by class
@@ -42,6 +58,25 @@ else:
     print(f"Found {len(benign_sms)} {CLASS_BENIGN} SMS")
 
 # --- Generate Embeddings for each class ---
+def encode_sms(sms_list):
+    """
+    Encode a list of SMS in a single call.
+    sentence-transformers batches internally (with length-sorted padding) and shows a progress bar.
+    Duplicate SMS (common with spam templates) are encoded only once; the result
+    still has one row per input SMS, in the original order.
+    Embeddings are normalized here so search is a plain dot product.
+    """
+    # Map every SMS to the position of its first occurrence
+    unique_positions = {}
+    inverse = np.fromiter((unique_positions.setdefault(sms, len(unique_positions)) for sms in sms_list),
+                          dtype=np.int64, count=len(sms_list))
+    unique_sms = list(unique_positions)
+    if len(unique_sms) < len(sms_list):
+        print(f"Skipping {len(sms_list) - len(unique_sms)} duplicate SMS ({len(unique_sms)} unique to encode)")
+    
+    unique_embeddings = encode_many(model, unique_sms, batch_size=ENCODE_BATCH_SIZE, show_progress_bar=True)
+    return normalizar_embeddings(unique_embeddings)[inverse]
+
 def generate_embeddings_for_class(sms_list, sms_ids, class_name):
     """Generate embeddings for a specific class of SMS"""
     if not sms_list:
@@ -51,35 +86,7 @@ def generate_embeddings_for_class(sms_list, sms_ids, class_name):
     print(f"\nGenerating embeddings for {class_name} SMS...")
     print(f"Total {class_name} SMS to process: {len(sms_list)}")
     
-    # Start timer
-    start_time = time.time()
-    
-    # Process in batches to show detailed progress
-    batch_size = 100
-    total_sms = len(sms_list)
-    sms_embeddings = []
-    
-    for i in range(0, total_sms, batch_size):
-        batch = sms_list[i:i + batch_size]
-        batch_embeddings = model.encode(batch, show_progress_bar=False)
-        sms_embeddings.extend(batch_embeddings)
-        
-        # Calculate progress and ETA
-        processed = min(i + batch_size, total_sms)
-        progress = (processed / total_sms) * 100
-        
-        print(f"Processed: {processed}/{total_sms} {class_name} SMS ({progress:.1f}%)")
-        
-        # Simple ETA based on average time per batch
-        if i > 0:
-            elapsed_time = time.time() - start_time
-            avg_time_per_batch = elapsed_time / (i // batch_size + 1)
-            remaining_batches = (total_sms - processed) // batch_size + (1 if total_sms % batch_size > 0 else 0)
-            eta_seconds = remaining_batches * avg_time_per_batch
-            eta_minutes = eta_seconds / 60
-            print(f"Estimated time remaining: {eta_minutes:.1f} minutes")
-    
-    sms_embeddings = np.array(sms_embeddings)
+    sms_embeddings = encode_sms(sms_list)
     print(f"{class_name} embeddings generated.")
     
     # Create embeddings folder if it doesn't exist
@@ -90,10 +97,25 @@ def generate_embeddings_for_class(sms_list, sms_ids, class_name):
     texts_path = os.path.join('embeddings', f'{class_name}_texts.npy')
     ids_path = os.path.join('embeddings', f'{class_name}_ids.npy')
     
-    np.save(embeddings_path, sms_embeddings)
-    np.save(texts_path, np.array(sms_list))
+    np.save(embeddings_path, sms_embeddings.astype(EMBEDDINGS_DTYPE))
+    guardar_textos(sms_list, texts_path)  # written as Arrow .feather next to the .npy files
     np.save(ids_path, np.array(sms_ids))
     
+    # Build the FAISS index too (only if faiss is installed)
+    index_path = guardar_indice_faiss(sms_embeddings, embeddings_path)
+    if index_path:
+        print(f"{class_name} FAISS index saved to: {index_path}")
+    
+    # Binary signatures for Hamming pre-ranking (only for large collections)
+    bits_path = guardar_firmas_binarias(sms_embeddings, embeddings_path)
+    if bits_path:
+        print(f"{class_name} binary signatures saved to: {bits_path}")
+    
+    # int8 copy (4x smaller) with per-vector scales, for SimSIMD's int8 dot-product kernel (only if simsimd is installed)
+    int8_path = guardar_embeddings_int8(sms_embeddings, embeddings_path)
+    if int8_path:
+        print(f"{class_name} int8 embeddings saved to: {int8_path}")
+    
     print(f"{class_name} embeddings, texts, and IDs saved in the 'embeddings/' folder.")
     return embeddings_path, texts_path, ids_path
 
@@ -108,35 +130,7 @@ if SMS_FILE.endswith('.py'):
     print("Generating embeddings for the SMS collection...")
     print(f"Total SMS to process: {len(sms_collection)}")
     
-    # Start timer
-    start_time = time.time()
-    
-    # Process in batches to show detailed progress
-    batch_size = 100
-    total_sms = len(sms_collection)
-    sms_embeddings = []
-    
-    for i in range(0, total_sms, batch_size):
-        batch = sms_collection[i:i + batch_size]
-        batch_embeddings = model.encode(batch, show_progress_bar=False)
-        sms_embeddings.extend(batch_embeddings)
-        
-        # Calculate progress and ETA
-        processed = min(i + batch_size, total_sms)
-        progress = (processed / total_sms) * 100
-        
-        print(f"Processed: {processed}/{total_sms} SMS ({progress:.1f}%)")
-        
-        # Simple ETA based on average time per batch
-        if i > 0:
-            elapsed_time = time.time() - start_time
-            avg_time_per_batch = elapsed_time / (i // batch_size + 1)
-            remaining_batches = (total_sms - processed) // batch_size + (1 if total_sms % batch_size > 0 else 0)
-            eta_seconds = remaining_batches * avg_time_per_batch
-            eta_minutes = eta_seconds / 60
-            print(f"Estimated time remaining: {eta_minutes:.1f} minutes")
-    
-    sms_embeddings = np.array(sms_embeddings)
+    sms_embeddings = encode_sms(sms_collection)
     print("Embeddings generated.")
     
     # Create embeddings folder if it doesn't exist
@@ -146,8 +140,23 @@ if SMS_FILE.endswith('.py'):
     embeddings_path = os.path.join('embeddings', SMS_FILE.replace('.' + EXTENSION, '_embeddings.npy'))
     texts_path = os.path.join('embeddings', SMS_FILE.replace('.' + EXTENSION, '_texts.npy'))
     
-    np.save(embeddings_path, sms_embeddings)
-    np.save(texts_path, np.array(sms_collection))
+    np.save(embeddings_path, sms_embeddings.astype(EMBEDDINGS_DTYPE))
+    guardar_textos(sms_collection, texts_path)  # written as Arrow .feather next to the .npy files
+    
+    # Build the FAISS index too (only if faiss is installed)
+    index_path = guardar_indice_faiss(sms_embeddings, embeddings_path)
+    if index_path:
+        print(f"FAISS index saved to: {index_path}")
+    
+    # Binary signatures for Hamming pre-ranking (only for large collections)
+    bits_path = guardar_firmas_binarias(sms_embeddings, embeddings_path)
+    if bits_path:
+        print(f"binary signatures saved to: {bits_path}")
+    
+    # int8 copy (4x smaller) with per-vector scales, for SimSIMD's int8 dot-product kernel (only if simsimd is installed)
+    int8_path = guardar_embeddings_int8(sms_embeddings, embeddings_path)
+    if int8_path:
+        print(f"int8 embeddings saved to: {int8_path}")
     
     print(f"Embeddings and texts saved in the 'embeddings/' folder.")
 else:
@@ -0,0 +1,113 @@
+"""
+Process-wide cache of SentenceTransformer models.
+
+Loading a model (weights, tokenizer, device upload) takes seconds, so every
+script gets its model through get_model() and reuses it within the process.
+"""
+
+import os
+import functools
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+# threadpoolctl is optional: it limits the BLAS/OpenMP pools of libraries already loaded
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+# psutil is optional: it counts physical cores (os.cpu_count counts hardware threads)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def physical_cores():
+    """Number of physical cores (all logical CPUs if psutil is not installed)."""
+    cores = psutil.cpu_count(logical=False) if psutil is not None else None
+    return max(1, cores or os.cpu_count() or 1)
+
+PHYSICAL_CORES = physical_cores()
+
+def configure_threads():
+    """
+    Pin PyTorch and the BLAS/OpenMP pools to the physical cores, for stable query latency.
+
+    Meant for the interactive query scripts; call it at startup, before the model
+    does any work (inter-op threads can only be set before PyTorch's first parallel op).
+    """
+    torch.set_num_threads(PHYSICAL_CORES)
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        pass
+
+    # NumPy's BLAS is already loaded, so OMP_NUM_THREADS would come too late;
+    # limit its pools at runtime instead (explicit user settings still win)
+    if threadpool_limits is not None and "OMP_NUM_THREADS" not in os.environ:
+        threadpool_limits(PHYSICAL_CORES)
+
+def onnx_session_options():
+    """ONNX Runtime session options pinned to the physical cores, for stable query latency."""
+    import onnxruntime as ort
+
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = PHYSICAL_CORES
+    session_options.inter_op_num_threads = PHYSICAL_CORES
+    return session_options
+
+def default_device():
+    """Use the GPU when available."""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+@functools.lru_cache(maxsize=4)
+def get_model(name, device=None, dtype=None, backend="torch", onnx_file=None, cache_folder=None):
+    """
+    Load a SentenceTransformer model once per process and reuse it.
+
+    Args:
+        name: SentenceTransformer model name
+        device: "cuda", "cpu", ... (default: GPU if available)
+        dtype: torch dtype name for the weights, e.g. "float16" (default: float16 on GPU, float32 on CPU)
+        backend: "torch" or "onnx"
+        onnx_file: ONNX file inside the model repository (only for backend="onnx"),
+            e.g. the INT8 quantized "model_qint8_avx512_vnni.onnx"
+        cache_folder: Folder where downloaded models are stored (optional)
+
+    Returns:
+        SentenceTransformer model
+    """
+    device = device or default_device()
+
+    if backend == "onnx":
+        try:
+            model_kwargs = {"session_options": onnx_session_options()}
+            if onnx_file:
+                model_kwargs["file_name"] = onnx_file
+            return SentenceTransformer(name, device=device, backend="onnx", cache_folder=cache_folder,
+                                       model_kwargs=model_kwargs)
+        except Exception as e:
+            # Missing optimum/onnxruntime, hub errors, unknown onnx_file...: PyTorch always works
+            print(f"Warning: ONNX backend not available ({e}). Using PyTorch.")
+
+    if dtype is None and device.startswith("cuda"):
+        # FP16 weights roughly double throughput on GPU
+        dtype = "float16"
+    model_kwargs = {"torch_dtype": getattr(torch, dtype)} if dtype else {}
+    return SentenceTransformer(name, device=device, cache_folder=cache_folder, model_kwargs=model_kwargs)
+
+def encode_many(model, texts, batch_size=64, show_progress_bar=False):
+    """
+    Encode many texts in a single encode() call, as normalized float32 embeddings.
+
+    SentenceTransformer.encode already sorts its input by length before
+    batching (so each batch pads to similar lengths) and restores the original
+    order, so one call over the whole list is the cheapest way to encode it.
+
+    Returns:
+        Array (len(texts), dim) with one L2-normalized row per text, in input order
+    """
+    embeddings = model.encode(list(texts), batch_size=batch_size, show_progress_bar=show_progress_bar,
+                              convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32)
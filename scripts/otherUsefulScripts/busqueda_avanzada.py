@@ -1,27 +1,36 @@
 import os
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import torch
 import json
+import argparse
+import functools
 from datetime import datetime
+from model_cache import get_model, configure_threads
 from utils import exportar_resultados_json, calcular_estadisticas_similitud, formatear_similitud
+from utils import cargar_embeddings_normalizados, cargar_textos
+from utils import cargar_indice_faiss, buscar_en_indice_faiss, cargar_firmas_binarias, buscar_con_firmas
+from utils import cargar_embeddings_int8, buscar_int8, buscar_top_k, precompilar_kernels
 
 # --- Configuración ---
 ARCHIVO_SMS = os.path.join('data', 'combined_limited.csv')
 EXTENSION = ARCHIVO_SMS.split('.')[-1]
 COLUMNA_TEXTO_SMS = 'sms_text'
 MODELO_EMBEDDING = 'all-MiniLM-L6-v2'
+# Backend de inferencia: 'onnx' (INT8 cuantizado, más rápido en CPU) o 'torch'
+BACKEND_EMBEDDING = 'onnx'
+ARCHIVO_ONNX = 'model_qint8_avx512_vnni.onnx'
+CARPETA_MODELOS = 'models'
 
 # Rutas de los archivos de embeddings
 RUTA_EMBEDDINGS = os.path.join('embeddings', ARCHIVO_SMS.replace('.' + EXTENSION, '_embeddings.npy'))
 RUTA_TEXTOS = os.path.join('embeddings', ARCHIVO_SMS.replace('.' + EXTENSION, '_texts.npy'))
 
 def cargar_embeddings_y_textos():
-    """Carga los embeddings y textos guardados previamente."""
+    """Carga los embeddings (normalizados una sola vez) y textos guardados previamente."""
     try:
-        embeddings = np.load(RUTA_EMBEDDINGS)
-        textos = np.load(RUTA_TEXTOS, allow_pickle=True)
+        embeddings = cargar_embeddings_normalizados(RUTA_EMBEDDINGS)
+        textos = cargar_textos(RUTA_TEXTOS)
         print(f"Embeddings cargados: {embeddings.shape}")
         print(f"Textos cargados: {len(textos)} SMS")
         return embeddings, textos
@@ -30,43 +39,92 @@ def cargar_embeddings_y_textos():
         print("Ejecuta primero: python scripts/generar_embeddings.py")
         return None, None
 
-def buscar_sms_similares(consulta, embeddings, textos, modelo, top_k=5, umbral_similitud=0.0):
+@functools.lru_cache(maxsize=1)
+def cargar_sistema():
+    """
+    Carga una sola vez por proceso el modelo, los embeddings y las estructuras de búsqueda.
+    
+    Las siguientes llamadas devuelven los mismos objetos, así que cada consulta
+    solo paga la codificación y la búsqueda (sin el arranque en frío del modelo).
+    
+    Returns:
+        Tupla (modelo, embeddings, textos, indice, firmas, embeddings_int8, escalas_int8)
+    
+    Raises:
+        FileNotFoundError: Si no se han generado los embeddings
+    """
+    print("Cargando modelo de embeddings...")
+    modelo = get_model(MODELO_EMBEDDING, backend=BACKEND_EMBEDDING, onnx_file=ARCHIVO_ONNX, cache_folder=CARPETA_MODELOS)
+    print("Modelo cargado.")
+    
+    embeddings, textos = cargar_embeddings_y_textos()
+    if embeddings is None:
+        raise FileNotFoundError(RUTA_EMBEDDINGS)
+    indice = cargar_indice_faiss(RUTA_EMBEDDINGS, len(embeddings))
+    firmas = cargar_firmas_binarias(RUTA_EMBEDDINGS, len(embeddings))
+    embeddings_int8, escalas_int8 = cargar_embeddings_int8(RUTA_EMBEDDINGS)
+    precompilar_kernels()
+    return modelo, embeddings, textos, indice, firmas, embeddings_int8, escalas_int8
+
+@functools.lru_cache(maxsize=1024)
+def codificar_consulta(modelo, consulta):
+    """
+    Genera el embedding normalizado de una consulta, con caché LRU.
+    
+    Se devuelve como bytes (float32) para que la caché ocupe poco y no se
+    pueda modificar el embedding guardado.
+    """
+    # Sin registro de autograd: solo inferencia
+    with torch.inference_mode():
+        embedding = modelo.encode([consulta], normalize_embeddings=True, convert_to_numpy=True)
+    return embedding.astype(np.float32).tobytes()
+
+def buscar_sms_similares(consulta, embeddings, textos, modelo, top_k=5, umbral_similitud=0.0, indice=None, firmas=None,
+                         embeddings_int8=None, escalas_int8=None):
     """
     Busca los SMS más similares a la consulta usando similitud coseno.
     
     Args:
         consulta: Texto de búsqueda
-        embeddings: Array de embeddings de la colección
+        embeddings: Array de embeddings normalizados de la colección
         textos: Lista de textos originales
         modelo: Modelo de SentenceTransformer
         top_k: Número de resultados a retornar
         umbral_similitud: Umbral mínimo de similitud (0.0 a 1.0)
+        indice: Índice FAISS de la colección (opcional)
+        firmas: Firmas binarias de la colección para una primera etapa por Hamming (opcional)
+        embeddings_int8: Embeddings int8 de la colección para una primera etapa con SimSIMD (opcional)
+        escalas_int8: Escala de cada vector de embeddings_int8
     
     Returns:
         Lista de diccionarios con resultados
     """
-    # Generar embedding de la consulta
-    embedding_consulta = modelo.encode([consulta])
+    # Generar embedding de la consulta (memorizado para consultas repetidas)
+    embedding_consulta = np.frombuffer(codificar_consulta(modelo, consulta.strip()), dtype=np.float32).reshape(1, -1)
     
-    # Calcular similitud coseno con todos los embeddings
-    similitudes = cosine_similarity(embedding_consulta, embeddings)[0]
-    
-    # Filtrar por umbral de similitud
-    indices_filtrados = np.where(similitudes >= umbral_similitud)[0]
-    
-    if len(indices_filtrados) == 0:
-        return []
-    
-    # Obtener los índices de los top_k más similares
-    similitudes_filtradas = similitudes[indices_filtrados]
-    indices_top = indices_filtrados[np.argsort(similitudes_filtradas)[::-1][:top_k]]
+    if indice is not None or firmas is not None or embeddings_int8 is not None:
+        # Búsqueda en el índice FAISS, por firmas binarias o en int8 (ya devuelven los top_k ordenados)
+        if indice is not None:
+            similitudes_top, indices_top = buscar_en_indice_faiss(indice, embedding_consulta, top_k)
+        elif firmas is not None:
+            similitudes_top, indices_top = buscar_con_firmas(embedding_consulta, embeddings, firmas, top_k)
+        else:
+            similitudes_top, indices_top = buscar_int8(embedding_consulta, embeddings_int8, escalas_int8, embeddings, top_k)
+        filtro = similitudes_top >= umbral_similitud
+        similitudes_top, indices_top = similitudes_top[filtro], indices_top[filtro]
+    else:
+        # Similitud coseno con todos los embeddings y top_k, después el umbral: como el
+        # umbral es monótono, equivale a filtrar primero, sin copiar los índices y valores filtrados
+        similitudes_top, indices_top = buscar_top_k(embedding_consulta, embeddings, top_k)
+        filtro = similitudes_top >= umbral_similitud
+        similitudes_top, indices_top = similitudes_top[filtro], indices_top[filtro]
     
     # Crear lista de resultados
     resultados = []
-    for idx in indices_top:
+    for idx, similitud in zip(indices_top, similitudes_top):
         resultados.append({
-            'texto': textos[idx],
-            'similitud': similitudes[idx],
+            'texto': textos[int(idx)].as_py(),
+            'similitud': similitud,
             'indice': idx
         })
     
@@ -82,18 +140,17 @@ def exportar_resultados_csv(resultados, consulta):
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    datos_exportar = []
-    for i, resultado in enumerate(resultados, 1):
-        datos_exportar.append({
-            'ranking': i,
-            'texto': resultado['texto'],
-            'similitud': float(resultado['similitud']),  # Convertir float32 a float
-            'indice': resultado['indice']
-        })
-    
-    df = pd.DataFrame(datos_exportar)
+    # Una columna por campo, sin crear un diccionario por fila
+    n = len(resultados)
+    df = pd.DataFrame({
+        'ranking': np.arange(1, n + 1),
+        'texto': [resultado['texto'] for resultado in resultados],
+        'similitud': np.fromiter((resultado['similitud'] for resultado in resultados), dtype=np.float64, count=n),
+        'indice': np.fromiter((resultado['indice'] for resultado in resultados), dtype=np.int64, count=n)
+    })
     nombre_archivo = f"resultados_busqueda_{timestamp}.csv"
-    df.to_csv(nombre_archivo, index=False, encoding='utf-8')
+    with open(nombre_archivo, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        df.to_csv(f, index=False, lineterminator='\n')
     
     return nombre_archivo
 
@@ -111,16 +168,25 @@ def mostrar_estadisticas(resultados):
     print(f"  Mediana: {formatear_similitud(stats['mediana'])}")
     print(f"  Total: {stats['total']}")
 
-def main():
-    """Función principal del script de búsqueda avanzada."""
-    print("Cargando modelo de embeddings...")
-    modelo = SentenceTransformer(MODELO_EMBEDDING)
-    print("Modelo cargado.")
+def main(exacto=False):
+    """
+    Función principal del script de búsqueda avanzada.
     
-    # Cargar embeddings y textos
-    embeddings, textos = cargar_embeddings_y_textos()
-    if embeddings is None:
+    Args:
+        exacto: Si es True se ignoran el índice FAISS, las firmas binarias y los
+            embeddings int8, y cada consulta se compara con toda la colección
+    """
+    # Hilos de PyTorch y BLAS fijados a los núcleos físicos, antes de cargar el modelo
+    configure_threads()
+    
+    # Cargar modelo, embeddings y textos
+    try:
+        modelo, embeddings, textos, indice, firmas, embeddings_int8, escalas_int8 = cargar_sistema()
+    except FileNotFoundError:
         return
+    if exacto:
+        indice = firmas = embeddings_int8 = escalas_int8 = None
+        print("Búsqueda exacta: se compara cada consulta con toda la colección.")
     
     print("\n" + "="*60)
     print("BÚSQUEDA SEMÁNTICA AVANZADA")
@@ -207,7 +273,11 @@ def main():
                 textos, 
                 modelo, 
                 top_k=config['top_k'],
-                umbral_similitud=config['umbral_similitud']
+                umbral_similitud=config['umbral_similitud'],
+                indice=indice,
+                firmas=firmas,
+                embeddings_int8=embeddings_int8,
+                escalas_int8=escalas_int8
             )
             
             # Guardar para exportar
@@ -226,4 +296,8 @@ def main():
                 print("No se encontraron resultados con los criterios especificados.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Búsqueda semántica avanzada de SMS.")
+    parser.add_argument("--exact", action="store_true",
+                        help="búsqueda exacta sobre todos los embeddings (sin índice ni etapas aproximadas)")
+    args = parser.parse_args()
+    main(exacto=args.exact) 
\ No newline at end of file
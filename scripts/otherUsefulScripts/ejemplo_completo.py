@@ -8,14 +8,13 @@ Este script demuestra:
 4. Exportación de resultados
 """
 
-import os
 import numpy as np
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import json
+import pyarrow.compute as pc
 from datetime import datetime
 from utils import exportar_resultados_json, calcular_estadisticas_similitud, formatear_similitud
+from utils import calcular_similitudes_lote, seleccionar_top_k, buscar_en_indice_faiss
+import busqueda_avanzada
+from model_cache import configure_threads
 
 # --- about the model ---
 # Model	                                   Size	    Speed	    Quality
@@ -23,51 +22,61 @@ from utils import exportar_resultados_json, calcular_estadisticas_similitud, for
 # all-MiniLM-L6-v2	                       ~80MB	⚡⚡	      ⭐⭐⭐
 # paraphrase-multilingual-MiniLM-L12-v2	   ~117MB	⚡  	       ⭐⭐⭐⭐
 
-# --- Configuración ---
-ARCHIVO_SMS = os.path.join('data', 'combined_limited.csv')
-EXTENSION = ARCHIVO_SMS.split('.')[-1]
-COLUMNA_TEXTO_SMS = 'sms_text'
-MODELO_EMBEDDING = 'all-MiniLM-L6-v2'
-
-# Rutas de los archivos de embeddings
-RUTA_EMBEDDINGS = os.path.join('embeddings', ARCHIVO_SMS.replace('.' + EXTENSION, '_embeddings.npy'))
-RUTA_TEXTOS = os.path.join('embeddings', ARCHIVO_SMS.replace('.' + EXTENSION, '_texts.npy'))
+# La configuración (modelo, backend, rutas de embeddings) es la de busqueda_avanzada.py
 
 def cargar_sistema():
-    """Carga el modelo y los embeddings."""
+    """Carga el modelo y los embeddings (una sola vez por proceso, ver busqueda_avanzada.cargar_sistema)."""
     print("Cargando sistema de embeddings...")
     
-    # Cargar modelo
-    modelo = SentenceTransformer(MODELO_EMBEDDING)
-    print("✓ Modelo cargado")
-    
-    # Cargar embeddings y textos
     try:
-        embeddings = np.load(RUTA_EMBEDDINGS)
-        textos = np.load(RUTA_TEXTOS, allow_pickle=True)
+        modelo, embeddings, textos, indice, _, _, _ = busqueda_avanzada.cargar_sistema()
+        print("✓ Modelo cargado")
         print(f"✓ Embeddings cargados: {embeddings.shape}")
         print(f"✓ Textos cargados: {len(textos)} SMS")
-        return modelo, embeddings, textos
+        if indice is not None:
+            print("✓ Índice FAISS cargado")
+        return modelo, embeddings, textos, indice
     except FileNotFoundError:
         print("❌ Error: No se encontraron los archivos de embeddings.")
         print("Ejecuta primero: python scripts/generar_embeddings.py")
-        return None, None, None
+        return None, None, None, None
 
-def buscar_sms_similares(consulta, embeddings, textos, modelo, top_k=3):
-    """Busca SMS similares a la consulta."""
-    embedding_consulta = modelo.encode([consulta])
-    similitudes = cosine_similarity(embedding_consulta, embeddings)[0]
-    indices_top = np.argsort(similitudes)[::-1][:top_k]
-    
-    resultados = []
-    for idx in indices_top:
-        resultados.append({
-            'texto': textos[idx],
-            'similitud': similitudes[idx],
-            'indice': idx
-        })
-    
-    return resultados
+def buscar_sms_similares(consulta, embeddings, textos, modelo, top_k=3, indice=None):
+    """Busca SMS similares a la consulta (con el índice FAISS si está disponible)."""
+    return buscar_sms_similares_lote([consulta], embeddings, textos, modelo, top_k, indice)[0]
+
+def buscar_sms_similares_lote(consultas, embeddings, textos, modelo, top_k=3, indice=None):
+    """
+    Busca SMS similares para varias consultas a la vez.
+    
+    Todas las consultas se codifican en una sola pasada del modelo y, sin
+    índice FAISS, las similitudes salen de una sola multiplicación de matrices.
+    
+    Returns:
+        Lista con la lista de resultados de cada consulta
+    """
+    embeddings_consultas = modelo.encode(consultas, normalize_embeddings=True, convert_to_numpy=True)
+    if indice is None:
+        similitudes = calcular_similitudes_lote(embeddings_consultas, embeddings)
+    
+    resultados_lote = []
+    for i in range(len(consultas)):
+        if indice is not None:
+            similitudes_top, indices_top = buscar_en_indice_faiss(indice, embeddings_consultas[i], top_k)
+        else:
+            indices_top = seleccionar_top_k(similitudes[i], top_k)
+            similitudes_top = similitudes[i][indices_top]
+        
+        resultados = []
+        for idx, similitud in zip(indices_top, similitudes_top):
+            resultados.append({
+                'texto': textos[int(idx)].as_py(),
+                'similitud': similitud,
+                'indice': idx
+            })
+        resultados_lote.append(resultados)
+    
+    return resultados_lote
 
 def mostrar_resultados(consulta, resultados):
     """Muestra los resultados de forma clara."""
@@ -90,19 +99,19 @@ def analizar_coleccion(textos):
     print("\n📊 ANÁLISIS DE LA COLECCIÓN")
     print("=" * 40)
     
-    # Estadísticas básicas
-    longitudes = [len(texto) for texto in textos]
+    # Estadísticas básicas (longitudes calculadas en Arrow, sin crear cadenas de Python)
+    longitudes = pc.utf8_length(textos).to_numpy()
     print(f"Total de SMS: {len(textos)}")
-    print(f"Longitud promedio: {np.mean(longitudes):.1f} caracteres")
-    print(f"Longitud mínima: {min(longitudes)} caracteres")
-    print(f"Longitud máxima: {max(longitudes)} caracteres")
+    print(f"Longitud promedio: {longitudes.mean():.1f} caracteres")
+    print(f"Longitud mínima: {longitudes.min()} caracteres")
+    print(f"Longitud máxima: {longitudes.max()} caracteres")
     
     # Ejemplos de SMS
     print(f"\n📝 Ejemplos de SMS en la colección:")
     for i in range(min(3, len(textos))):
-        print(f"   {i+1}. {textos[i][:50]}...")
+        print(f"   {i+1}. {textos[i].as_py()[:50]}...")
 
-def ejemplo_busquedas(modelo, embeddings, textos):
+def ejemplo_busquedas(modelo, embeddings, textos, indice=None):
     """Ejecuta búsquedas de ejemplo."""
     consultas_ejemplo = [
         "Shop till u Drop, IS IT YOU, either 10K, 5K, £500 Cash or £100 Travel voucher, Call now, 09064011000. NTT PO Box CR01327BT fixedline Cost 150ppm mobile vary",
@@ -115,8 +124,8 @@ def ejemplo_busquedas(modelo, embeddings, textos):
     print("\n🎯 BÚSQUEDAS DE EJEMPLO")
     print("=" * 40)
     
-    for consulta in consultas_ejemplo:
-        resultados = buscar_sms_similares(consulta, embeddings, textos, modelo, top_k=3)
+    resultados_lote = buscar_sms_similares_lote(consultas_ejemplo, embeddings, textos, modelo, top_k=3, indice=indice)
+    for consulta, resultados in zip(consultas_ejemplo, resultados_lote):
         mostrar_resultados(consulta, resultados)
 
 def exportar_ejemplo(consulta, resultados):
@@ -129,8 +138,11 @@ def main():
     print("🚀 SISTEMA DE EMBEDDINGS Y BÚSQUEDA SEMÁNTICA")
     print("=" * 60)
     
+    # Hilos de PyTorch y BLAS fijados a los núcleos físicos, antes de cargar el modelo
+    configure_threads()
+    
     # Cargar sistema
-    modelo, embeddings, textos = cargar_sistema()
+    modelo, embeddings, textos, indice = cargar_sistema()
     if modelo is None:
         return
     
@@ -138,17 +150,19 @@ def main():
     analizar_coleccion(textos)
     
     # Ejecutar búsquedas de ejemplo
-    #ejemplo_busquedas(modelo, embeddings, textos)
+    #ejemplo_busquedas(modelo, embeddings, textos, indice)
     
     # Ejemplo de exportación
     consulta_ejemplo = "Hola, ¿cómo estás?"
-    resultados_ejemplo = buscar_sms_similares(consulta_ejemplo, embeddings, textos, modelo, top_k=3)
+    resultados_ejemplo = buscar_sms_similares(consulta_ejemplo, embeddings, textos, modelo, top_k=3, indice=indice)
     exportar_ejemplo(consulta_ejemplo, resultados_ejemplo)
     
     print("\n✅ Ejemplo completado exitosamente!")
     print("\n💡 Para usar el sistema interactivamente:")
     print("   python scripts/busqueda_semantica.py")
     print("   python scripts/busqueda_avanzada.py")
+    print("\n🌐 Para mantener el modelo cargado entre consultas:")
+    print("   python scripts/serve.py")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -3,6 +3,53 @@ import os
 import sys
 import csv
 import re
+import ast
+
+def extraer_sms_data(content):
+    """
+    Obtiene la variable sms_data del contenido de un archivo Python.
+    
+    Si sms_data es una lista literal se analiza con ast.literal_eval (sin
+    compilar ni ejecutar código); si no, se ejecuta el archivo con exec.
+    
+    Args:
+        content: Contenido del archivo Python
+    
+    Returns:
+        Lista de diccionarios con los SMS
+    """
+    coincidencia = re.search(r'sms_data\s*=\s*(\[.*\])', content, re.DOTALL)
+    if coincidencia:
+        try:
+            return ast.literal_eval(coincidencia.group(1))
+        except (SyntaxError, ValueError):
+            pass
+    
+    # Crear un namespace local para ejecutar el código
+    local_namespace = {}
+    
+    # Ejecutar el archivo Python en el namespace local
+    exec(content, {}, local_namespace)
+    
+    # Obtener la variable sms_data
+    if 'sms_data' not in local_namespace:
+        raise ValueError("No se encontró la variable 'sms_data' en el archivo")
+    
+    return local_namespace['sms_data']
+
+def escribir_csv(output_path, sms_data, fieldnames):
+    """
+    Escribe los registros en un CSV con buffer de 1 MB.
+    
+    Raises:
+        ValueError: Si algún registro tiene campos que no están en fieldnames
+    """
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        
+        # Escribir todos los datos
+        writer.writerows(sms_data)
 
 def convert_py_to_csv():
     """
@@ -25,41 +72,28 @@ def convert_py_to_csv():
         
         print("🔄 Procesando archivo...")
         
-        # Crear un namespace local para ejecutar el código
-        local_namespace = {}
-        
-        # Ejecutar el archivo Python en el namespace local
-        exec(content, {}, local_namespace)
-        
-        # Obtener la variable sms_data
-        if 'sms_data' not in local_namespace:
-            raise ValueError("No se encontró la variable 'sms_data' en el archivo")
-        
-        sms_data = local_namespace['sms_data']
+        sms_data = extraer_sms_data(content)
         
         if sms_data:
-            # Recopilar todos los campos posibles de todos los registros
-            all_fieldnames = set()
-            for row in sms_data:
-                all_fieldnames.update(row.keys())
-            
-            # Convertir a lista y ordenar para consistencia
-            fieldnames = sorted(list(all_fieldnames))
-            
-            # Escribir a CSV
-            with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                # Escribir todos los datos
+            # Caso habitual: todos los registros tienen los campos del primero
+            fieldnames = list(sms_data[0].keys())
+            try:
+                escribir_csv(output_path, sms_data, fieldnames)
+            except ValueError:
+                # Algún registro tiene campos extra: usar la unión de todos los campos
+                all_fieldnames = set()
                 for row in sms_data:
-                    writer.writerow(row)
+                    all_fieldnames.update(row.keys())
                 
-                print(f"✅ Archivo convertido exitosamente!")
-                print(f"📁 Entrada: {input_path}")
-                print(f"📁 Salida: {output_path}")
-                print(f"📊 Registros procesados: {len(sms_data)}")
-                print(f"📋 Campos encontrados: {', '.join(fieldnames)}")
+                # Convertir a lista y ordenar para consistencia
+                fieldnames = sorted(list(all_fieldnames))
+                escribir_csv(output_path, sms_data, fieldnames)
+            
+            print(f"✅ Archivo convertido exitosamente!")
+            print(f"📁 Entrada: {input_path}")
+            print(f"📁 Salida: {output_path}")
+            print(f"📊 Registros procesados: {len(sms_data)}")
+            print(f"📋 Campos encontrados: {', '.join(fieldnames)}")
         else:
             print("❌ No se encontraron datos para convertir")
             
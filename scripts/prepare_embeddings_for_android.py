@@ -1,22 +1,48 @@
 #!/usr/bin/env python3
 """
 Script to prepare embeddings for Android use.
-Converts embeddings to JSON format for easy loading in Android.
+Writes the embeddings, texts and ids of each class as raw little-endian .bin
+files (memory-mappable on the device), plus a small JSON file describing them.
 """
 
 import os
 import sys
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+# orjson is optional: it serializes NumPy arrays in C, without tolist()
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Add the scripts directory to the path to import config
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config import MODEL_NAME, CLASS_SMISHING, CLASS_BENIGN
+from config import MODEL_NAME, CLASS_SMISHING, CLASS_BENIGN, ANDROID_EMBEDDINGS_DTYPE
+from utils import ruta_textos_feather, cargar_textos, cargar_ids, cuantizar_int8
+from model_cache import get_model, encode_many
+
+# Number of texts re-encoded to check the stored embeddings against the model
+VERIFY_SAMPLES = 256
+
+def write_json(path, data, indent=False):
+    """
+    Write data as UTF-8 JSON. NumPy arrays in data are serialized directly.
+    Compact by default; indent=True for small, human-readable files.
+    """
+    if orjson is not None:
+        options = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=options))
+        return
+    
+    data = {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in data.items()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2 if indent else None)
 
 def prepare_embeddings_for_android():
     """
-    Prepare embeddings in JSON format for Android use.
+    Prepare embeddings as raw .bin files (with JSON metadata) for Android use.
     """
     print("Preparing embeddings for Android...")
     
@@ -30,7 +56,8 @@ def prepare_embeddings_for_android():
     
     # Load the model to verify embeddings
     print(f"Loading model: {MODEL_NAME}")
-    model = SentenceTransformer(MODEL_NAME)
+    # Same cache key as convert_model_to_tflite, so prepare_for_android loads it only once
+    model = get_model(MODEL_NAME, device="cpu")
     
     # Process each class
     classes = [CLASS_SMISHING, CLASS_BENIGN]
@@ -44,36 +71,61 @@ def prepare_embeddings_for_android():
         ids_path = os.path.join(embeddings_dir, f'{class_name}_ids.npy')
         
         # Check if files exist
-        if not all(os.path.exists(path) for path in [embeddings_path, texts_path, ids_path]):
+        texts_exist = os.path.exists(texts_path) or os.path.exists(ruta_textos_feather(texts_path))
+        if not (texts_exist and os.path.exists(embeddings_path) and os.path.exists(ids_path)):
             print(f"Warning: {class_name} embedding files not found.")
             print("Run first: python scripts/generate_embeddings.py")
             continue
         
         # Load embeddings
         embeddings = np.load(embeddings_path)
-        texts = np.load(texts_path, allow_pickle=True)
-        ids = np.load(ids_path, allow_pickle=True)
+        texts = cargar_textos(texts_path)
+        ids = cargar_ids(ids_path)
         
         print(f"Loaded {len(embeddings)} {class_name} embeddings")
+        check_embeddings_match_model(model, embeddings, texts)
         
-        # Convert to JSON format
-        android_data = {
+        # Raw row-major binary arrays: no float text to parse, and no ZIP/NPY container,
+        # so the app can memory-map the embeddings directly
+        arrays = {}
+        if ANDROID_EMBEDDINGS_DTYPE == "int8":
+            # embedding = value * scale
+            arrays["embeddings"], arrays["scales"] = cuantizar_int8(embeddings)
+        else:
+            # float16 halves size and bandwidth; cosine on normalized 384-d vectors barely changes
+            arrays["embeddings"] = embeddings.astype(ANDROID_EMBEDDINGS_DTYPE)
+        arrays["texts_utf8"], arrays["text_offsets"] = pack_utf8(texts.to_pylist())
+        if ids.dtype.kind in "iuf":
+            arrays["ids"] = np.asarray(ids, dtype=np.int64)
+        else:
+            arrays["ids_utf8"], arrays["id_offsets"] = pack_utf8([str(sms_id) for sms_id in ids])
+        
+        array_files = {}
+        for name, array in arrays.items():
+            array_files[name] = f'{class_name}_{name}.bin'
+            np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<')).tofile(
+                os.path.join(android_assets_dir, array_files[name]))
+        
+        # Small JSON sidecar with what the app needs to interpret the arrays
+        meta = {
             "class": class_name,
             "model_name": MODEL_NAME,
             "embedding_dimension": embeddings.shape[1],
             "total_embeddings": len(embeddings),
-            "embeddings": embeddings.tolist(),
-            "texts": texts.tolist(),
-            "ids": ids.tolist()
+            "embedding_dtype": ANDROID_EMBEDDINGS_DTYPE,
+            "embeddings_file": array_files["embeddings"],
+            "arrays": {
+                name: {"file": array_files[name], "dtype": str(array.dtype), "shape": list(array.shape)}
+                for name, array in arrays.items()
+            },
         }
+        meta_path = os.path.join(android_assets_dir, f'{class_name}_meta.json')
+        write_json(meta_path, meta, indent=True)
         
-        # Save to JSON file
-        output_path = os.path.join(android_assets_dir, f'{class_name}_embeddings.json')
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(android_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"Saved {class_name} embeddings to: {output_path}")
-        print(f"File size: {os.path.getsize(output_path) / (1024*1024):.2f} MB")
+        embeddings_file_path = os.path.join(android_assets_dir, array_files["embeddings"])
+        print(f"Saved {class_name} embeddings, texts and ids to: {', '.join(array_files.values())}")
+        print(f"Embeddings file size: {os.path.getsize(embeddings_file_path) / (1024*1024):.2f} MB")
+        print(f"Saved {class_name} metadata to: {meta_path}")
     
     # Create a metadata file
     metadata = {
@@ -84,8 +136,7 @@ def prepare_embeddings_for_android():
     }
     
     metadata_path = os.path.join(android_assets_dir, "embeddings_metadata.json")
-    with open(metadata_path, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    write_json(metadata_path, metadata, indent=True)
     
     print(f"\nMetadata saved to: {metadata_path}")
     
@@ -97,17 +148,60 @@ def prepare_embeddings_for_android():
     print("Files created:")
     
     for class_name in classes:
-        json_path = os.path.join(android_assets_dir, f'{class_name}_embeddings.json')
-        if os.path.exists(json_path):
-            size_mb = os.path.getsize(json_path) / (1024*1024)
-            print(f"  - {class_name}_embeddings.json ({size_mb:.2f} MB)")
+        for filename in (f'{class_name}_embeddings.bin', f'{class_name}_meta.json'):
+            file_path = os.path.join(android_assets_dir, filename)
+            if os.path.exists(file_path):
+                size_mb = os.path.getsize(file_path) / (1024*1024)
+                print(f"  - {filename} ({size_mb:.2f} MB)")
     
     print(f"  - embeddings_metadata.json")
     print("\nNext steps:")
-    print("1. Copy the JSON files to your Android app's assets folder")
+    print("1. Copy the .bin and JSON files to your Android app's assets folder")
     print("2. Use the metadata to load embeddings in your Android app")
     print("3. Test semantic search functionality")
 
+def check_embeddings_match_model(model, embeddings, texts, num_samples=VERIFY_SAMPLES):
+    """
+    Re-encode a sample of the texts (one batched call) and compare with the stored
+    embeddings, to catch embeddings generated with a different model than the one shipped.
+    """
+    sample = np.random.default_rng(0).choice(len(texts), size=min(num_samples, len(texts)), replace=False)
+    fresh = encode_many(model, texts.take(sample).to_pylist())
+    stored = embeddings[sample].astype(np.float32)
+    stored /= np.maximum(np.linalg.norm(stored, axis=1, keepdims=True), 1e-12)
+    similarity = np.einsum('ij,ij->i', fresh, stored)
+    print(f"Re-encoded {len(sample)} texts: min cosine with stored embeddings {similarity.min():.4f}")
+    if similarity.min() < 0.99:
+        print(f"Warning: stored embeddings do not match {MODEL_NAME}. Regenerate them with generate_embeddings.py")
+
+def pack_utf8(strings):
+    """
+    Pack strings as one UTF-8 byte array plus int64 offsets (string i is
+    bytes[offsets[i]:offsets[i+1]]), which is trivial to read on Android.
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+def unpack_utf8(data, offsets, index):
+    """Decode string number index packed with pack_utf8."""
+    return data[offsets[index]:offsets[index + 1]].tobytes().decode('utf-8')
+
+def load_android_embeddings(android_assets_dir, meta):
+    """
+    Read the .bin files described by a meta JSON back: (float32 embeddings, arrays).
+    """
+    arrays = {
+        name: np.fromfile(os.path.join(android_assets_dir, info['file']),
+                          dtype=np.dtype(info['dtype']).newbyteorder('<')).reshape(info['shape'])
+        for name, info in meta['arrays'].items()
+    }
+    embeddings = arrays['embeddings'].astype(np.float32)
+    if meta['embedding_dtype'] == "int8":
+        embeddings *= arrays['scales'][:, None]
+    return embeddings, arrays
+
 def verify_embeddings():
     """
     Verify that the prepared embeddings work correctly.
@@ -117,19 +211,18 @@ def verify_embeddings():
     android_assets_dir = os.path.join(os.path.dirname(__file__), "..", "android_assets")
     
     for class_name in [CLASS_SMISHING, CLASS_BENIGN]:
-        json_path = os.path.join(android_assets_dir, f'{class_name}_embeddings.json')
+        meta_path = os.path.join(android_assets_dir, f'{class_name}_meta.json')
         
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
             
-            embeddings = np.array(data['embeddings'])
-            texts = data['texts']
-            ids = data['ids']
+            embeddings, arrays = load_android_embeddings(android_assets_dir, meta)
+            sample_text = unpack_utf8(arrays['texts_utf8'], arrays['text_offsets'], 0)
             
             print(f"[OK] {class_name}: {len(embeddings)} embeddings loaded")
             print(f"  - Embedding dimension: {embeddings.shape[1]}")
-            print(f"  - Sample text: '{texts[0][:50]}...'")
+            print(f"  - Sample text: '{sample_text[:50]}...'")
         else:
             print(f"[ERROR] {class_name}: File not found")
 
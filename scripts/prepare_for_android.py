@@ -3,22 +3,43 @@
 Main script to prepare everything for Android use.
 This script will:
 1. Convert the SentenceTransformers model to TensorFlow Lite
-2. Prepare embeddings in JSON format for Android
+2. Prepare embeddings as raw binary files for Android
 3. Create a complete Android-ready package
 """
 
 import os
 import sys
+import argparse
 import subprocess
 import shutil
 
 # Add the scripts directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import MODEL_NAME, CLASS_SMISHING, CLASS_BENIGN
+from convert_model_to_tflite import convert_model_to_tflite
+from prepare_embeddings_for_android import prepare_embeddings_for_android, verify_embeddings
+
+def run_step(step, description):
+    """
+    Run one preparation step in this process and handle errors.
+    
+    All steps share the interpreter, so PyTorch, TensorFlow and the
+    SentenceTransformer model (model_cache.get_model) are loaded only once.
+    """
+    print(f"\n{'='*60}")
+    print(f"STEP: {description}")
+    print(f"{'='*60}")
+    
+    try:
+        return step() is not False
+    except Exception as e:
+        print(f"Error in step '{description}': {e}")
+        return False
 
 def run_script(script_name, description):
     """
-    Run a Python script and handle errors.
+    Run a Python script in a separate interpreter (fallback for --subprocess).
+    The child's output is streamed as it runs.
     """
     print(f"\n{'='*60}")
     print(f"STEP: {description}")
@@ -31,14 +52,10 @@ def run_script(script_name, description):
         return False
     
     try:
-        result = subprocess.run([sys.executable, script_path], 
-                              capture_output=True, text=True, check=True)
-        print(result.stdout)
+        subprocess.run([sys.executable, script_path], check=True)
         return True
     except subprocess.CalledProcessError as e:
-        print(f"Error running {script_name}:")
-        print(f"STDOUT: {e.stdout}")
-        print(f"STDERR: {e.stderr}")
+        print(f"Error running {script_name} (exit code {e.returncode})")
         return False
 
 def create_android_package():
@@ -65,20 +82,44 @@ This directory contains all the files needed for SMS semantic search in your And
 ## Files Included:
 
 ### Model Files:
+- `sms_embedding_model.onnx` - INT8 ONNX model for ONNX Runtime Mobile (recommended)
 - `sms_embedding_model.tflite` - TensorFlow Lite model for generating embeddings
+- `tokenizer.json` and related files - Tokenizer to run on the device
 - Model: {MODEL_NAME}
 
 ### Embedding Files:
-- `smishing_embeddings.json` - Pre-computed embeddings for smishing SMS
-- `benign_embeddings.json` - Pre-computed embeddings for benign SMS
+- `smishing_*.bin` - Pre-computed embeddings, texts and ids for smishing SMS (raw binary arrays)
+- `smishing_meta.json` - File, shape and dtype of every smishing `.bin` array
+- `benign_*.bin` - Pre-computed embeddings, texts and ids for benign SMS (raw binary arrays)
+- `benign_meta.json` - File, shape and dtype of every benign `.bin` array
 - `embeddings_metadata.json` - Metadata about the embeddings
 
 ## How to Use:
 
 1. Copy all files to your Android app's `assets` folder
-2. Use TensorFlow Lite to load the model
-3. Load the JSON files to get pre-computed embeddings
-4. Implement cosine similarity search
+2. Use ONNX Runtime Mobile (or TensorFlow Lite) to load the model
+   - The ONNX model outputs token embeddings: apply mean pooling + L2 normalization
+   - The TFLite model already outputs the normalized sentence embedding
+3. Load the `.bin` arrays of each class (see "Loading the .bin files" below)
+4. If `embedding_dtype` is `int8`, multiply each embedding by its entry in `scales`
+   (or score with integer dot products and rescale by the query and row scales)
+5. Implement cosine similarity search
+
+## Loading the .bin files:
+
+Each `<class>_meta.json` lists the arrays of the class under `arrays`, with the
+`file`, `dtype` and `shape` of each one:
+- `embeddings` - `total_embeddings x embedding_dimension`, `int8`, `float16` or `float32`
+- `scales` - one `float32` per embedding (only for `int8`)
+- `texts_utf8` + `text_offsets` - all texts as UTF-8 bytes; text `i` is
+  `texts_utf8[text_offsets[i] until text_offsets[i+1]]`
+- `ids` (`int64`), or `ids_utf8` + `id_offsets` for string ids
+
+Every file is raw little-endian row-major data with no header. Memory-map it
+(`FileChannel.map` on an uncompressed asset, e.g. with `noCompress "bin"` in `build.gradle`)
+or read it into a `ByteBuffer` with `ByteOrder.LITTLE_ENDIAN`, and view it as a
+`FloatBuffer` (`float32`), a `ShortBuffer` (`float16`, convert with `Half.toFloat`),
+a `LongBuffer` (`int64`) or use the bytes directly (`int8`, `uint8`).
 
 ## Model Information:
 - Model: {MODEL_NAME}
@@ -98,7 +139,7 @@ implementation 'org.tensorflow:tensorflow-lite-support:0.4.2'
 val model = Interpreter(loadModelFile(context, "sms_embedding_model.tflite"))
 ```
 
-3. Load embeddings from JSON files
+3. Load embeddings from the .bin files (see the `*_meta.json` files for shape and dtype)
 4. Implement semantic search using cosine similarity
 
 ## File Sizes:
@@ -135,17 +176,22 @@ def test_android_assets():
     
     # Test embeddings loading
     for class_name in ['{CLASS_SMISHING}', '{CLASS_BENIGN}']:
-        json_file = f'{{class_name}}_embeddings.json'
+        meta_file = f'{{class_name}}_meta.json'
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
             
-            embeddings = np.array(data['embeddings'])
-            texts = data['texts']
+            arrays = {{name: np.fromfile(info['file'], dtype=np.dtype(info['dtype']).newbyteorder('<')).reshape(info['shape'])
+                      for name, info in meta['arrays'].items()}}
+            embeddings = arrays['embeddings'].astype(np.float32)
+            if meta['embedding_dtype'] == "int8":
+                embeddings *= arrays['scales'][:, None]
+            offsets = arrays['text_offsets']
+            sample = arrays['texts_utf8'][offsets[0]:offsets[1]].tobytes().decode('utf-8')
             
             print(f"✓ {{class_name}}: {{len(embeddings)}} embeddings loaded")
             print(f"  - Dimension: {{embeddings.shape[1]}}")
-            print(f"  - Sample: '{{texts[0][:50]}}...'")
+            print(f"  - Sample: '{{sample[:50]}}...'")
             
         except Exception as e:
             print(f"✗ {{class_name}}: Error - {{e}}")
@@ -167,9 +213,12 @@ if __name__ == "__main__":
     
     return True
 
-def main():
+def main(use_subprocess=False):
     """
     Main function to orchestrate the entire Android preparation process.
+    
+    Args:
+        use_subprocess: Run each step in its own interpreter instead of in-process
     """
     print("="*60)
     print("ANDROID PREPARATION TOOL")
@@ -179,15 +228,28 @@ def main():
     print("="*60)
     
     # Step 1: Convert model to TensorFlow Lite
-    if not run_script("convert_model_to_tflite.py", "Converting model to TensorFlow Lite"):
+    if use_subprocess:
+        converted = run_script("convert_model_to_tflite.py", "Converting model to TensorFlow Lite")
+    else:
+        converted = run_step(convert_model_to_tflite, "Converting model to TensorFlow Lite")
+    if not converted:
         print("Model conversion failed!")
         return False
     
     # Step 2: Prepare embeddings for Android
-    if not run_script("prepare_embeddings_for_android.py", "Preparing embeddings for Android"):
+    if use_subprocess:
+        prepared = run_script("prepare_embeddings_for_android.py", "Preparing embeddings for Android")
+    else:
+        prepared = run_step(prepare_embeddings_for_android, "Preparing embeddings for Android")
+    if not prepared:
         print("Embeddings preparation failed!")
         return False
     
+    # The subprocess step already verifies them in its own __main__
+    if not use_subprocess and not run_step(verify_embeddings, "Verifying Android embeddings"):
+        print("Embeddings verification failed!")
+        return False
+    
     # Step 3: Create Android package
     if not create_android_package():
         print("Android package creation failed!")
@@ -206,5 +268,9 @@ def main():
     return True
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description="Prepare the model and embeddings for Android.")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="run each step in a separate Python process (reloads the model per step)")
+    args = parser.parse_args()
+    success = main(use_subprocess=args.subprocess)
     sys.exit(0 if success else 1) 
\ No newline at end of file
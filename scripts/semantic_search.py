@@ -1,9 +1,16 @@
 import os
+import functools
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
+import pyarrow as pa
+import torch
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from .config import *
+from .utils import cargar_textos, cargar_ids, cargar_embeddings_normalizados, buscar_top_k
+from .utils import cargar_embeddings_int8, buscar_int8, cargar_indice_faiss, buscar_en_indice_faiss
+from .utils import calcular_similitudes
+from .model_cache import get_model, encode_many, default_device
 
 
 # --- Configuration ---
@@ -37,52 +44,206 @@ def load_embeddings_and_texts_for_class(class_name):
         return None, None, None
     
     try:
-        embeddings = np.load(embeddings_path)
-        texts = np.load(texts_path, allow_pickle=True)
-        ids = np.load(ids_path, allow_pickle=True)
+        # Normalized once and memory-mapped; float16 is kept only when SimSIMD can use it directly
+        embeddings = cargar_embeddings_normalizados(embeddings_path)
+        texts = cargar_textos(texts_path)
+        ids = cargar_ids(ids_path)
         return embeddings, texts, ids
     except FileNotFoundError:
         print(f"Error: {class_name} embeddings files not found.")
         print("Run first: python scripts/generate_embeddings.py")
         return None, None, None
 
-def search_similar_sms(query, embeddings, texts, ids, model, top_k=3):
+EMBEDDINGS_PATHS = {CLASS_SMISHING: SMISHING_EMBEDDINGS_PATH, CLASS_BENIGN: BENIGN_EMBEDDINGS_PATH}
+
+def load_int8_embeddings_for_class(class_name):
+    """
+    Load the int8 embeddings (memory-mapped) and per-vector scales for a class.
+    Returns (None, None) if they were not generated or SimSIMD is not installed.
+    """
+    if class_name not in EMBEDDINGS_PATHS:
+        return None, None
+    return cargar_embeddings_int8(EMBEDDINGS_PATHS[class_name])
+
+def load_index_for_class(class_name, total_embeddings=None):
+    """
+    Load the FAISS index built by generate_embeddings for a class (HNSW for
+    mid-sized classes, see utils.guardar_indice_faiss).
+    Returns None if it was not built, FAISS is not installed, or it does not
+    hold total_embeddings vectors (a stale index from an earlier run).
+    """
+    if class_name not in EMBEDDINGS_PATHS:
+        return None
+    return cargar_indice_faiss(EMBEDDINGS_PATHS[class_name], total_embeddings)
+
+# Search data of each class, loaded once per process (see load_class_data)
+_CLASS_DATA = {}
+
+def load_class_data(class_name):
+    """
+    Load everything needed to search a class, once per process.
+    
+    Returns:
+        Tuple (embeddings, texts, ids, embeddings_int8, scales_int8, index). The first three
+        are None if the class files are missing (not cached, so they are retried).
+    """
+    if class_name not in _CLASS_DATA:
+        embeddings, texts, ids = load_embeddings_and_texts_for_class(class_name)
+        if embeddings is None:
+            return None, None, None, None, None, None
+        embeddings_int8, scales_int8 = load_int8_embeddings_for_class(class_name)
+        index = load_index_for_class(class_name, len(embeddings))
+        _CLASS_DATA[class_name] = (embeddings, texts, ids, embeddings_int8, scales_int8, index)
+    return _CLASS_DATA[class_name]
+
+# FP16 copies of each class's embeddings resident on the GPU (see load_gpu_embeddings_for_class)
+_GPU_EMBEDDINGS = {}
+
+def load_gpu_embeddings_for_class(class_name):
+    """
+    Upload a class's normalized embeddings to the GPU as float16, once per process.
+    Callers only ask for it when the class is scanned exactly (no FAISS index, or exact=True).
+    Returns None without CUDA or if the class files are missing.
+    """
+    if default_device() != "cuda":
+        return None
+    if class_name not in _GPU_EMBEDDINGS:
+        embeddings = load_class_data(class_name)[0]
+        if embeddings is None:
+            return None
+        _GPU_EMBEDDINGS[class_name] = torch.from_numpy(np.array(embeddings, dtype=np.float16)).to("cuda")
+    return _GPU_EMBEDDINGS[class_name]
+
+def _search_gpu(query_embedding, embeddings_gpu, top_k):
+    """Dot product and top-k on the GPU (FP16 tensor cores), returns (similarities, indices) as NumPy."""
+    query = torch.as_tensor(query_embedding).to(embeddings_gpu.device, dtype=embeddings_gpu.dtype).reshape(-1)
+    with torch.inference_mode():
+        similarities, indices = torch.topk(embeddings_gpu @ query, min(top_k, len(embeddings_gpu)))
+    return similarities.float().cpu().numpy(), indices.cpu().numpy()
+
+# Worker threads shared by all calls, to search the two classes concurrently
+_SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Recent semantic_search_sms results: key -> (query embedding, model, top_k, exact, results), in LRU order
+_QUERY_CACHE = OrderedDict()
+# semantic_search_sms may be called from several threads (e.g. serve.py)
+_QUERY_CACHE_LOCK = threading.Lock()
+
+def _copy_results(results):
+    """Copy of a results dict, so callers and the cache never share the per-class lists."""
+    return {class_name: list(class_results) for class_name, class_results in results.items()}
+
+def _lookup_query_cache(query_embedding, model, top_k, exact):
+    """Return a copy of the results of a cached query similar enough to this one, or None."""
+    with _QUERY_CACHE_LOCK:
+        candidates = [key for key, (_, m, k, ex, _) in _QUERY_CACHE.items()
+                      if m is model and k == top_k and ex == exact]
+        if not candidates:
+            return None
+        cached_embeddings = np.stack([_QUERY_CACHE[key][0] for key in candidates])
+        similarities = calcular_similitudes(query_embedding, cached_embeddings)
+        best = int(np.argmax(similarities))
+        if similarities[best] < QUERY_CACHE_THRESHOLD:
+            return None
+        _QUERY_CACHE.move_to_end(candidates[best])
+        return _copy_results(_QUERY_CACHE[candidates[best]][4])
+
+def _store_query_cache(query_embedding, model, top_k, exact, results):
+    """Add a copy of a query's results to the cache, evicting the least recently used entry."""
+    with _QUERY_CACHE_LOCK:
+        _QUERY_CACHE[(model, query_embedding.tobytes(), top_k, exact)] = (
+            query_embedding, model, top_k, exact, _copy_results(results))
+        if len(_QUERY_CACHE) > QUERY_CACHE_SIZE:
+            _QUERY_CACHE.popitem(last=False)
+
+# Embeddings of recently encoded query texts: (model, text) -> embedding, in LRU order (guarded by _QUERY_CACHE_LOCK)
+_QUERY_EMBEDDINGS = OrderedDict()
+
+def _encode_cached(model, texts):
+    """
+    Encode query texts, reusing the embeddings of texts seen recently.
+    
+    Only the texts not in the cache go through the tokenizer and the model,
+    in a single batched encode_many call.
+    
+    Returns:
+        Array (len(texts), dim) of normalized float32 embeddings, in input order
+    """
+    with _QUERY_CACHE_LOCK:
+        embeddings = {}
+        for text in texts:
+            if (model, text) in _QUERY_EMBEDDINGS:
+                _QUERY_EMBEDDINGS.move_to_end((model, text))
+                embeddings[text] = _QUERY_EMBEDDINGS[(model, text)]
+    
+    # Encode outside the lock, other threads can keep using the cache meanwhile
+    missing = list(dict.fromkeys(text for text in texts if text not in embeddings))
+    if missing:
+        embeddings.update(zip(missing, encode_many(model, missing, batch_size=32)))
+        with _QUERY_CACHE_LOCK:
+            for text in missing:
+                _QUERY_EMBEDDINGS[(model, text)] = embeddings[text]
+            while len(_QUERY_EMBEDDINGS) > QUERY_CACHE_SIZE:
+                _QUERY_EMBEDDINGS.popitem(last=False)
+    
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([embeddings[text] for text in texts])
+
+def search_similar_sms(query, embeddings, texts, ids, model, top_k=3, embeddings_int8=None, scales_int8=None,
+                       index=None, query_embedding=None, embeddings_gpu=None):
     """
     Search for SMS most similar to the query using cosine similarity.
     
     Args:
         query: Search text
         embeddings: Array of embeddings from the collection
-        texts: List of original texts
+        texts: Original texts (pyarrow array as returned by cargar_textos, NumPy array or list)
         ids: List of SMS IDs
         model: SentenceTransformer model
         top_k: Number of results to return
+        embeddings_int8: int8 copy of the embeddings, scanned with SimSIMD's int8 kernel (optional)
+        scales_int8: Per-vector scales of embeddings_int8
+        index: FAISS index of the embeddings, e.g. HNSW (optional, takes precedence)
+        query_embedding: Normalized embedding of the query, if already computed (optional)
+        embeddings_gpu: FP16 copy of the embeddings on the GPU, scanned exactly with torch (optional)
     
     Returns:
         List of dictionaries with text, similarity, and sms_id
     """
-    # Generate embedding for the query
-    query_embedding = model.encode([query])
-    
-    # Calculate cosine similarity with all embeddings
-    similarities = cosine_similarity(query_embedding, embeddings)[0]
+    # Generate normalized embedding for the query
+    if query_embedding is None:
+        query_embedding = model.encode([query], normalize_embeddings=True)[0]
     
-    # Get indices of top_k most similar
-    top_indices = np.argsort(similarities)[::-1][:top_k]
+    if index is not None:
+        # Approximate nearest neighbours (HNSW: ~O(log N) per query)
+        top_similarities, top_indices = buscar_en_indice_faiss(index, query_embedding, top_k)
+    elif embeddings_gpu is not None:
+        # Exact scan on the GPU: one matmul plus torch.topk
+        top_similarities, top_indices = _search_gpu(query_embedding, embeddings_gpu, top_k)
+    elif embeddings_int8 is not None:
+        # int8 scan (4x less memory traffic), then the best candidates are rescored in float
+        top_similarities, top_indices = buscar_int8(query_embedding, embeddings_int8, scales_int8, embeddings, top_k)
+    else:
+        # Embeddings are normalized, so cosine similarity is a dot product (SimSIMD kernel when installed).
+        # Top_k via argpartition (O(N)) plus a sort of the k best, not a full argsort
+        top_similarities, top_indices = buscar_top_k(query_embedding, embeddings, top_k)
     
-    # Create results list
-    results = []
-    for idx in top_indices:
-        result = {
-            'text': texts[idx],
-            'similarity': similarities[idx],
-            'sms_id': ids[idx]
-        }
-        results.append(result)
+    # Gather the k rows in bulk (one Arrow take, one NumPy fancy index) as plain Python values
+    top_indices = np.asarray(top_indices, dtype=np.int64)
+    if isinstance(texts, (pa.Array, pa.ChunkedArray)):
+        top_texts = texts.take(top_indices).to_pylist()
+    else:
+        top_texts = [str(text) for text in np.asarray(texts)[top_indices].tolist()]
+    top_ids = np.asarray(ids)[top_indices].tolist()
+    top_similarities = np.asarray(top_similarities, dtype=np.float32).tolist()
     
-    return results
+    return [
+        {'text': text, 'similarity': similarity, 'sms_id': sms_id}
+        for text, similarity, sms_id in zip(top_texts, top_similarities, top_ids)
+    ]
 
-def semantic_search_sms(sms_text, top_k=3, model=None):
+def semantic_search_sms(sms_text, top_k=3, model=None, exact=False):
     """
     Perform semantic search for a given SMS text across both classes.
     
@@ -90,6 +251,7 @@ def semantic_search_sms(sms_text, top_k=3, model=None):
         sms_text (str): The SMS text to search for similar messages
         top_k (int): Number of top results to return for each class
         model: Optional pre-loaded SentenceTransformer model to prevent memory leaks
+        exact (bool): Scan every embedding instead of using the ANN index / int8 copies
     
     Returns:
         dict: Dictionary containing search results for both classes
@@ -98,30 +260,90 @@ def semantic_search_sms(sms_text, top_k=3, model=None):
                 'benign': [list of benign results]
             }
     """
+    return semantic_search_sms_batch([sms_text], top_k, model, exact)[0]
+
+def semantic_search_sms_batch(sms_texts, top_k=3, model=None, exact=False):
+    """
+    Perform semantic search for several SMS texts across both classes.
+    
+    All texts are encoded in one batched forward pass (recently seen texts are
+    reused), then each one is searched.
+    
+    Args:
+        sms_texts (list): SMS texts to search for similar messages
+        top_k (int): Number of top results to return for each class
+        model: Optional pre-loaded SentenceTransformer model
+        exact (bool): Scan every embedding instead of using the ANN index / int8 copies
+    
+    Returns:
+        list: One results dictionary per text, as returned by semantic_search_sms
+    """
     # Load the embedding model only if not provided
     if model is None:
-        model = SentenceTransformer(EMBEDDING_MODEL)
+        model = get_model(EMBEDDING_MODEL)
     
-    # Load embeddings, texts, and IDs for both classes
-    smishing_embeddings, smishing_texts, smishing_ids = load_embeddings_and_texts_for_class(CLASS_SMISHING)
-    benign_embeddings, benign_texts, benign_ids = load_embeddings_and_texts_for_class(CLASS_BENIGN)
+    # Load embeddings, texts, and IDs for both classes (cached after the first call)
+    (smishing_embeddings, smishing_texts, smishing_ids,
+     smishing_int8, smishing_scales, smishing_index) = load_class_data(CLASS_SMISHING)
+    (benign_embeddings, benign_texts, benign_ids,
+     benign_int8, benign_scales, benign_index) = load_class_data(CLASS_BENIGN)
+    if exact:
+        smishing_int8 = smishing_scales = smishing_index = None
+        benign_int8 = benign_scales = benign_index = None
+    # The GPU copy is only needed by classes scanned exactly (no FAISS index, or exact=True)
+    smishing_gpu = load_gpu_embeddings_for_class(CLASS_SMISHING) if smishing_index is None else None
+    benign_gpu = load_gpu_embeddings_for_class(CLASS_BENIGN) if benign_index is None else None
     
-    results = {
-        'smishing': [],
-        'benign': []
-    }
+    # One forward pass for the texts not encoded recently, each embedding shared by both classes
+    query_embeddings = _encode_cached(model, sms_texts)
     
-    # Search in smishing class
+    # Search function of each available class, bound to its data
+    searches = {}
     if smishing_embeddings is not None and smishing_texts is not None and smishing_ids is not None:
-        smishing_results = search_similar_sms(sms_text, smishing_embeddings, smishing_texts, smishing_ids, model, top_k)
-        results['smishing'] = smishing_results
-    
-    # Search in benign class
+        searches['smishing'] = functools.partial(
+            search_similar_sms, embeddings=smishing_embeddings, texts=smishing_texts, ids=smishing_ids,
+            model=model, top_k=top_k, embeddings_int8=smishing_int8, scales_int8=smishing_scales,
+            index=smishing_index, embeddings_gpu=smishing_gpu)
     if benign_embeddings is not None and benign_texts is not None and benign_ids is not None:
-        benign_results = search_similar_sms(sms_text, benign_embeddings, benign_texts, benign_ids, model, top_k)
-        results['benign'] = benign_results
+        searches['benign'] = functools.partial(
+            search_similar_sms, embeddings=benign_embeddings, texts=benign_texts, ids=benign_ids,
+            model=model, top_k=top_k, embeddings_int8=benign_int8, scales_int8=benign_scales,
+            index=benign_index, embeddings_gpu=benign_gpu)
+    
+    # The two classes are independent read-only scans. Search them concurrently only when
+    # both go through a single-threaded kernel (FAISS index or SimSIMD int8, which release
+    # the GIL); the GPU path and the exact Numba/BLAS scans already use the whole device
+    use_pool = (len(searches) == 2 and smishing_gpu is None and benign_gpu is None
+                and (smishing_index is not None or smishing_int8 is not None)
+                and (benign_index is not None or benign_int8 is not None))
+    
+    batch_results = []
+    for sms_text, query_embedding in zip(sms_texts, query_embeddings):
+        # Near-duplicate recent queries reuse their results
+        if QUERY_CACHE_THRESHOLD < 1.0:
+            cached_results = _lookup_query_cache(query_embedding, model, top_k, exact)
+            if cached_results is not None:
+                batch_results.append(cached_results)
+                continue
+        
+        if use_pool:
+            futures = {class_name: _SEARCH_EXECUTOR.submit(search, sms_text, query_embedding=query_embedding)
+                       for class_name, search in searches.items()}
+            class_results = {class_name: future.result() for class_name, future in futures.items()}
+        else:
+            class_results = {class_name: search(sms_text, query_embedding=query_embedding)
+                             for class_name, search in searches.items()}
+        
+        results = {
+            'smishing': class_results.get('smishing', []),
+            'benign': class_results.get('benign', [])
+        }
+        
+        if QUERY_CACHE_THRESHOLD < 1.0:
+            _store_query_cache(query_embedding, model, top_k, exact, results)
+        batch_results.append(results)
     
-    return results
+    return batch_results
 
 def show_results(results):
     """Display search results in a clear format."""
@@ -138,12 +360,16 @@ def show_results(results):
 def interactive_search():
     """Interactive search interface for command line use."""
     print("Loading embedding model...")
-    model = SentenceTransformer(EMBEDDING_MODEL)
+    model = get_model(EMBEDDING_MODEL)
     print("Model loaded.")
     
     # Load embeddings, texts, and IDs for all classes
-    smishing_embeddings, smishing_texts, smishing_ids = load_embeddings_and_texts_for_class(CLASS_SMISHING)
-    benign_embeddings, benign_texts, benign_ids = load_embeddings_and_texts_for_class(CLASS_BENIGN)
+    (smishing_embeddings, smishing_texts, smishing_ids,
+     smishing_int8, smishing_scales, smishing_index) = load_class_data(CLASS_SMISHING)
+    (benign_embeddings, benign_texts, benign_ids,
+     benign_int8, benign_scales, benign_index) = load_class_data(CLASS_BENIGN)
+    smishing_gpu = load_gpu_embeddings_for_class(CLASS_SMISHING) if smishing_index is None else None
+    benign_gpu = load_gpu_embeddings_for_class(CLASS_BENIGN) if benign_index is None else None
     
     if smishing_embeddings is None and benign_embeddings is None:
         print("Error: No embeddings found for any class.")
@@ -179,13 +405,17 @@ def interactive_search():
                 search_query = input(f"Enter your query for {class_name} SMS: ").strip()
                 if search_query:
                     print(f"\nSearching for {class_name} SMS similar to: '{search_query}'")
-                    results = search_similar_sms(search_query, smishing_embeddings, smishing_texts, smishing_ids, model, top_k=3)
+                    results = search_similar_sms(search_query, smishing_embeddings, smishing_texts, smishing_ids, model, top_k=3,
+                                                 embeddings_int8=smishing_int8, scales_int8=smishing_scales,
+                                                 index=smishing_index, embeddings_gpu=smishing_gpu)
                     show_results(results)
             elif class_name == CLASS_BENIGN and benign_embeddings is not None:
                 search_query = input(f"Enter your query for {class_name} SMS: ").strip()
                 if search_query:
                     print(f"\nSearching for {class_name} SMS similar to: '{search_query}'")
-                    results = search_similar_sms(search_query, benign_embeddings, benign_texts, benign_ids, model, top_k=3)
+                    results = search_similar_sms(search_query, benign_embeddings, benign_texts, benign_ids, model, top_k=3,
+                                                 embeddings_int8=benign_int8, scales_int8=benign_scales,
+                                                 index=benign_index, embeddings_gpu=benign_gpu)
                     show_results(results)
             else:
                 print(f"Unknown class '{class_name}' or embeddings not available. Available classes: {CLASS_SMISHING}, {CLASS_BENIGN}")
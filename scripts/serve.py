@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+HTTP search server that keeps the embedding model loaded between queries.
+
+The model and the per-class search data (semantic_search.load_class_data) are
+loaded once at startup, so each request only pays encode + search.
+
+Usage (from the repository root):
+    python scripts/serve.py
+
+    curl -X POST localhost:8000/search -H "Content-Type: application/json" \
+         -d '{"query": "Your account has been suspended", "top_k": 5}'
+"""
+
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+# Make the scripts package importable when run as python scripts/serve.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.config import CLASS_SMISHING, CLASS_BENIGN
+from scripts.model_cache import get_model
+from scripts.semantic_search import EMBEDDING_MODEL, load_class_data, semantic_search_sms
+
+HOST = "127.0.0.1"
+PORT = 8000
+
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 5
+    threshold: float = 0.0
+
+@asynccontextmanager
+async def lifespan(app):
+    # Pay the model cold start and the embeddings load once, before the first request
+    get_model(EMBEDDING_MODEL)
+    for class_name in (CLASS_SMISHING, CLASS_BENIGN):
+        load_class_data(class_name)
+    yield
+
+app = FastAPI(title="SMS semantic search", lifespan=lifespan)
+
+@app.post("/search")
+def search(request: SearchRequest):
+    """Return the SMS most similar to the query, for each class."""
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    if all(load_class_data(class_name)[0] is None for class_name in (CLASS_SMISHING, CLASS_BENIGN)):
+        raise HTTPException(status_code=503, detail="No embeddings found, run scripts/generate_embeddings.py")
+
+    results = semantic_search_sms(request.query, top_k=request.top_k, model=get_model(EMBEDDING_MODEL))
+
+    return {
+        "query": request.query,
+        "results": {
+            class_name: [result for result in class_results if result['similarity'] >= request.threshold]
+            for class_name, class_results in results.items()
+        }
+    }
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=HOST, port=PORT)
@@ -10,7 +10,7 @@ import os
 # Add the scripts directory to the path so we can import the function
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from semantic_search import semantic_search_sms
+from semantic_search import semantic_search_sms_batch
 
 def test_semantic_search():
     """Test the semantic search function with various SMS examples."""
@@ -35,41 +35,41 @@ def test_semantic_search():
     print("This script tests the semantic_search_sms function with various SMS examples.")
     print("Each test will show the top 3 most similar SMS for both smishing and benign classes.\n")
     
-    for i, test_sms in enumerate(test_sms_list, 1):
+    try:
+        # Encode and search all test SMS in one batch
+        all_results = semantic_search_sms_batch(test_sms_list, top_k=3)
+    except Exception as e:
+        print(f"Error during search: {e}")
+        print("Make sure you have generated the embeddings first using:")
+        print("python scripts/generate_embeddings.py")
+        return
+    
+    for i, (test_sms, results) in enumerate(zip(test_sms_list, all_results), 1):
         print(f"\n{'='*60}")
         print(f"TEST {i}: {test_sms[:50]}{'...' if len(test_sms) > 50 else ''}")
         print(f"{'='*60}")
         
-        try:
-            # Perform semantic search
-            results = semantic_search_sms(test_sms, top_k=3)
-            
-            # Display smishing results
-            if results['smishing']:
-                print(f"\n--- TOP 3 SMISHING RESULTS ---")
-                for j, result in enumerate(results['smishing'], 1):
-                    print(f"{j}. Similarity: {result['similarity']:.3f}")
-                    print(f"   SMS ID: {result['sms_id']}")
-                    print(f"   Text: {result['text']}")
-                    print()
-            else:
-                print("\n--- NO SMISHING RESULTS FOUND ---")
-            
-            # Display benign results
-            if results['benign']:
-                print(f"--- TOP 3 BENIGN RESULTS ---")
-                for j, result in enumerate(results['benign'], 1):
-                    print(f"{j}. Similarity: {result['similarity']:.3f}")
-                    print(f"   SMS ID: {result['sms_id']}")
-                    print(f"   Text: {result['text']}")
-                    print()
-            else:
-                print("--- NO BENIGN RESULTS FOUND ---")
-                
-        except Exception as e:
-            print(f"Error during search: {e}")
-            print("Make sure you have generated the embeddings first using:")
-            print("python scripts/generate_embeddings.py")
+        # Display smishing results
+        if results['smishing']:
+            print(f"\n--- TOP 3 SMISHING RESULTS ---")
+            for j, result in enumerate(results['smishing'], 1):
+                print(f"{j}. Similarity: {result['similarity']:.3f}")
+                print(f"   SMS ID: {result['sms_id']}")
+                print(f"   Text: {result['text']}")
+                print()
+        else:
+            print("\n--- NO SMISHING RESULTS FOUND ---")
+        
+        # Display benign results
+        if results['benign']:
+            print(f"--- TOP 3 BENIGN RESULTS ---")
+            for j, result in enumerate(results['benign'], 1):
+                print(f"{j}. Similarity: {result['similarity']:.3f}")
+                print(f"   SMS ID: {result['sms_id']}")
+                print(f"   Text: {result['text']}")
+                print()
+        else:
+            print("--- NO BENIGN RESULTS FOUND ---")
         
         print("\n" + "-"*60)
 
@@ -2,10 +2,108 @@
 Utilidades para el sistema de embeddings y búsqueda semántica.
 """
 
+import os
 import json
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
 from datetime import datetime
 
+# SimSIMD es opcional: si no está instalado se usa un producto matriz-vector de NumPy
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# FAISS es opcional: si está instalado se usa un índice en lugar del cálculo directo
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Numba es opcional: compila un producto matriz-vector repartido entre todos los núcleos
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# orjson es opcional: serializa en C y acepta escalares de NumPy sin convertirlos
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# A partir de este tamaño se usa un grafo HNSW en vez de un índice exacto
+MIN_VECTORES_HNSW = 10000
+# A partir de este tamaño se usa un índice comprimido (OPQ + IVF-PQ)
+MIN_VECTORES_IVFPQ = 100000
+
+# A partir de este tamaño se guardan firmas binarias para una primera búsqueda por Hamming
+MIN_VECTORES_BINARIO = 50000
+CANDIDATOS_HAMMING = 100
+
+# Candidatos que se reordenan en float tras la búsqueda aproximada en int8
+CANDIDATOS_INT8 = 50
+
+# Tamaño de cada bloque de filas en la búsqueda exacta sin Numba (cabe en la caché L2)
+BYTES_BLOQUE_L2 = 256 * 1024
+
+# Número de bits a 1 de cada byte (popcount)
+_POPCOUNT_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+if numba is not None:
+    # Sin cache=True en los kernels: la caché en disco guarda el nombre del módulo (utils o
+    # scripts.utils) y falla al cargarse desde el otro; precompilar_kernels paga la compilación al arrancar
+    @numba.njit(parallel=True, fastmath=True)
+    def _similitudes_numba(embeddings_norm, consulta):
+        """Producto punto de cada fila con la consulta, con las filas repartidas entre hilos."""
+        n, dimension = embeddings_norm.shape
+        similitudes = np.empty(n, dtype=np.float32)
+        for i in numba.prange(n):
+            suma = np.float32(0.0)
+            for j in range(dimension):
+                suma += embeddings_norm[i, j] * consulta[j]
+            similitudes[i] = suma
+        return similitudes
+
+    @numba.njit(parallel=True, fastmath=True)
+    def _top_k_numba(embeddings_norm, consulta, k, n_bloques):
+        """
+        Producto punto y selección top_k en una sola pasada, sin el vector completo de similitudes.
+        
+        Cada hilo recorre un bloque de filas y mantiene su propio montículo
+        mínimo de tamaño k; devuelve los k candidatos de cada bloque.
+        """
+        n, dimension = embeddings_norm.shape
+        tam_bloque = (n + n_bloques - 1) // n_bloques
+        # Centinela finito: fastmath permite suponer que no hay infinitos
+        valores = np.full((n_bloques, k), -1e30, dtype=np.float32)
+        indices = np.full((n_bloques, k), -1, dtype=np.int64)
+        for b in numba.prange(n_bloques):
+            monticulo_v = valores[b]
+            monticulo_i = indices[b]
+            for i in range(b * tam_bloque, min(n, (b + 1) * tam_bloque)):
+                suma = np.float32(0.0)
+                for j in range(dimension):
+                    suma += embeddings_norm[i, j] * consulta[j]
+                if suma > monticulo_v[0]:
+                    # Sustituir la raíz (el menor) y hundirla hasta su sitio
+                    monticulo_v[0] = suma
+                    monticulo_i[0] = i
+                    pos = 0
+                    while True:
+                        hijo = 2 * pos + 1
+                        if hijo >= k:
+                            break
+                        if hijo + 1 < k and monticulo_v[hijo + 1] < monticulo_v[hijo]:
+                            hijo += 1
+                        if monticulo_v[hijo] >= monticulo_v[pos]:
+                            break
+                        monticulo_v[pos], monticulo_v[hijo] = monticulo_v[hijo], monticulo_v[pos]
+                        monticulo_i[pos], monticulo_i[hijo] = monticulo_i[hijo], monticulo_i[pos]
+                        pos = hijo
+        return valores.ravel(), indices.ravel()
+
 def serializar_resultados(resultados):
     """
     Convierte los resultados de búsqueda a un formato JSON serializable.
@@ -16,14 +114,21 @@ def serializar_resultados(resultados):
     Returns:
         Lista de diccionarios serializables
     """
-    resultados_serializables = []
-    for resultado in resultados:
-        resultados_serializables.append({
-            'texto': str(resultado['texto']),
-            'similitud': float(resultado['similitud']),  # Convertir float32 a float
-            'indice': int(resultado['indice'])
-        })
-    return resultados_serializables
+    n = len(resultados)
+    # Conversión en bloque: float32/int64 de NumPy a float/int de Python con tolist()
+    textos = [str(resultado['texto']) for resultado in resultados]
+    similitudes = np.fromiter((resultado['similitud'] for resultado in resultados), dtype=np.float64, count=n).tolist()
+    indices = np.fromiter((resultado['indice'] for resultado in resultados), dtype=np.int64, count=n).tolist()
+    return [
+        {'texto': texto, 'similitud': similitud, 'indice': indice}
+        for texto, similitud, indice in zip(textos, similitudes, indices)
+    ]
+
+def _valor_json(valor):
+    """Convierte para orjson los valores que no sabe serializar (p. ej. escalares de pyarrow) a texto."""
+    if isinstance(valor, pa.Scalar):
+        return valor.as_py()
+    return str(valor)
 
 def exportar_resultados_json(resultados, consulta, nombre_archivo=None):
     """
@@ -39,8 +144,12 @@ def exportar_resultados_json(resultados, consulta, nombre_archivo=None):
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # Convertir resultados a formato serializable
-    resultados_serializables = serializar_resultados(resultados)
+    if orjson is not None:
+        # orjson serializa directamente los float32/int64 de NumPy, sin recorrer los resultados
+        resultados_serializables = resultados
+    else:
+        # Convertir resultados a formato serializable
+        resultados_serializables = serializar_resultados(resultados)
     
     # Preparar datos para exportar
     datos_json = {
@@ -55,8 +164,12 @@ def exportar_resultados_json(resultados, consulta, nombre_archivo=None):
         nombre_archivo = f"resultados_busqueda_{timestamp}.json"
     
     # Escribir archivo
-    with open(nombre_archivo, 'w', encoding='utf-8') as f:
-        json.dump(datos_json, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        with open(nombre_archivo, 'wb') as f:
+            f.write(orjson.dumps(datos_json, default=_valor_json, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(nombre_archivo, 'w', encoding='utf-8') as f:
+            json.dump(datos_json, f, ensure_ascii=False, indent=2)
     
     return nombre_archivo
 
@@ -79,14 +192,15 @@ def calcular_estadisticas_similitud(resultados):
             'total': 0
         }
     
-    similitudes = [float(r['similitud']) for r in resultados]
+    # Un único array float64, sin lista intermedia de Python
+    similitudes = np.fromiter((r['similitud'] for r in resultados), dtype=np.float64, count=len(resultados))
     
     return {
-        'maxima': max(similitudes),
-        'minima': min(similitudes),
-        'promedio': np.mean(similitudes),
-        'mediana': np.median(similitudes),
-        'total': len(similitudes)
+        'maxima': float(similitudes.max()),
+        'minima': float(similitudes.min()),
+        'promedio': float(similitudes.mean()),
+        'mediana': float(np.median(similitudes)),
+        'total': int(similitudes.size)
     }
 
 def formatear_similitud(valor):
@@ -99,4 +213,476 @@ def formatear_similitud(valor):
     Returns:
         String formateado
     """
-    return f"{float(valor):.3f}" 
\ No newline at end of file
+    return f"{float(valor):.3f}"
+
+def normalizar_embeddings(embeddings, dtype=np.float32):
+    """
+    Normaliza los embeddings a norma L2 unitaria.
+    
+    Las normas se calculan siempre en float32, aunque se guarde en float16.
+    
+    Args:
+        embeddings: Array (N, D) de embeddings
+        dtype: Tipo de datos del resultado (float32 o float16)
+    
+    Returns:
+        Array contiguo del tipo indicado con filas de norma 1
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    normas = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.ascontiguousarray(embeddings / np.maximum(normas, 1e-12), dtype=dtype)
+
+def cargar_embeddings_normalizados(ruta_embeddings):
+    """
+    Carga los embeddings ya normalizados, usando una caché *_norm.npy.
+    
+    La caché se regenera si el archivo original es más reciente y se abre
+    mapeada en memoria. Conserva el tipo de datos original, salvo los embeddings
+    float16 sin SimSIMD, que se guardan ya en float32 (NumPy no tiene BLAS para
+    float16) para que el producto sea un único sgemv sobre el archivo mapeado.
+    
+    Args:
+        ruta_embeddings: Ruta al archivo .npy de embeddings
+    
+    Returns:
+        Array contiguo con filas de norma 1
+    """
+    ruta_norm = ruta_embeddings.replace('.npy', '_norm.npy')
+    if os.path.exists(ruta_norm) and os.path.getmtime(ruta_norm) >= os.path.getmtime(ruta_embeddings):
+        # Mapeado en memoria: el sistema operativo carga solo las páginas que se usan
+        embeddings = np.load(ruta_norm, mmap_mode='r')
+        if simsimd is not None or embeddings.dtype == np.float32:
+            return embeddings
+    
+    embeddings = np.load(ruta_embeddings)
+    dtype = embeddings.dtype if simsimd is not None else np.float32
+    np.save(ruta_norm, normalizar_embeddings(embeddings, dtype=dtype))
+    return np.load(ruta_norm, mmap_mode='r')
+
+def ruta_textos_feather(ruta_textos):
+    """Ruta del archivo Feather equivalente a un archivo *_texts.npy."""
+    return ruta_textos.replace('.npy', '.feather')
+
+def guardar_textos(textos, ruta_textos):
+    """
+    Guarda los textos en formato Arrow/Feather (UTF-8 contiguo, sin pickle).
+    
+    Se guarda sin compresión para poder abrirlo mapeado en memoria.
+    
+    Args:
+        textos: Lista de textos
+        ruta_textos: Ruta *_texts.npy de referencia (se guarda como .feather)
+    
+    Returns:
+        Ruta del archivo guardado
+    """
+    ruta_feather = ruta_textos_feather(ruta_textos)
+    tabla = pa.Table.from_pydict({"text": pa.array(textos, type=pa.string())})
+    feather.write_feather(tabla, ruta_feather, compression='uncompressed')
+    return ruta_feather
+
+def cargar_textos(ruta_textos):
+    """
+    Carga los textos de la colección como columna de Arrow.
+    
+    Usa el archivo .feather mapeado en memoria si existe; si no, el .npy
+    antiguo. Para obtener un texto como str: textos[idx].as_py().
+    
+    Args:
+        ruta_textos: Ruta al archivo *_texts.npy de la colección
+    
+    Returns:
+        pyarrow.ChunkedArray de textos
+    """
+    ruta_feather = ruta_textos_feather(ruta_textos)
+    if os.path.exists(ruta_feather):
+        return pa.ipc.open_file(pa.memory_map(ruta_feather)).read_all().column("text")
+    
+    try:
+        textos = np.load(ruta_textos)
+    except ValueError:
+        # Archivo antiguo guardado como array de objetos (requiere pickle)
+        textos = np.load(ruta_textos, allow_pickle=True)
+    return pa.chunked_array([pa.array(textos.tolist(), type=pa.string())])
+
+def cargar_ids(ruta_ids):
+    """
+    Carga los IDs de los SMS (.npy numérico o de cadenas, mapeado en memoria).
+    
+    Solo los archivos antiguos guardados como array de objetos usan pickle.
+    
+    Args:
+        ruta_ids: Ruta al archivo *_ids.npy de la colección
+    
+    Returns:
+        Array de IDs
+    """
+    try:
+        return np.load(ruta_ids, mmap_mode='r')
+    except ValueError:
+        # Archivo antiguo guardado como array de objetos (requiere pickle)
+        return np.load(ruta_ids, allow_pickle=True)
+
+def calcular_similitudes_lote(embeddings_consultas, embeddings_norm):
+    """
+    Calcula la similitud coseno de varias consultas contra toda la colección.
+    
+    Con SimSIMD usa su kernel de producto punto (AVX-512/AVX2/NEON, sin copias);
+    con Numba, una consulta se reparte por filas entre todos los núcleos; si no,
+    con NumPy es una sola multiplicación de matrices (Q @ Eᵀ) para todas las consultas.
+    
+    Args:
+        embeddings_consultas: Embeddings normalizados de las consultas, forma (Q, D)
+        embeddings_norm: Array (N, D) de embeddings normalizados (float32 o float16)
+    
+    Returns:
+        Array (Q, N) con la similitud de cada consulta con cada SMS
+    """
+    dimension = embeddings_norm.shape[1]
+    if simsimd is not None:
+        # SimSIMD trabaja directamente en float16 o float32, las consultas deben tener el mismo tipo.
+        # Los vectores ya están normalizados: basta el producto punto, sin recalcular normas
+        consultas = np.ascontiguousarray(embeddings_consultas, dtype=embeddings_norm.dtype).reshape(-1, dimension)
+        return np.asarray(simsimd.cdist(consultas, embeddings_norm, metric="dot"), dtype=np.float32)
+    # Con vectores normalizados el coseno es un simple producto punto
+    consultas = np.ascontiguousarray(embeddings_consultas, dtype=np.float32).reshape(-1, dimension)
+    if numba is not None and len(consultas) == 1 and embeddings_norm.dtype == np.float32:
+        # Una sola consulta: producto matriz-vector paralelo aunque BLAS use un solo hilo
+        return _similitudes_numba(np.ascontiguousarray(embeddings_norm), consultas[0])[None, :]
+    return consultas @ embeddings_norm.T
+
+def calcular_similitudes(embedding_consulta, embeddings_norm):
+    """
+    Calcula la similitud coseno de una consulta contra toda la colección.
+    
+    Args:
+        embedding_consulta: Embedding normalizado de la consulta, forma (1, D) o (D,)
+        embeddings_norm: Array (N, D) de embeddings normalizados (float32 o float16)
+    
+    Returns:
+        Array (N,) con la similitud de cada SMS
+    """
+    return calcular_similitudes_lote(embedding_consulta, embeddings_norm)[0]
+
+def buscar_top_k(embedding_consulta, embeddings_norm, top_k):
+    """
+    Busca las top_k filas más similares a la consulta en toda la colección.
+    
+    Con Numba (y sin SimSIMD) usa un kernel que calcula el producto punto y
+    mantiene los mejores k en la misma pasada; si no, recorre la colección en
+    bloques de BYTES_BLOQUE_L2 y combina los mejores k de cada bloque, sin
+    crear el vector completo de similitudes.
+    
+    Args:
+        embedding_consulta: Embedding normalizado de la consulta, forma (1, D) o (D,)
+        embeddings_norm: Array (N, D) de embeddings normalizados
+        top_k: Número de resultados a retornar
+    
+    Returns:
+        Tupla (similitudes, indices) ordenada por similitud descendente
+    """
+    if numba is not None and simsimd is None and embeddings_norm.dtype == np.float32 and top_k > 0:
+        consulta = np.ascontiguousarray(embedding_consulta, dtype=np.float32).reshape(-1)
+        n_bloques = max(1, min(numba.get_num_threads(), len(embeddings_norm) // top_k))
+        valores, indices = _top_k_numba(np.ascontiguousarray(embeddings_norm), consulta, top_k, n_bloques)
+        validos = indices >= 0
+        valores, indices = valores[validos], indices[validos]
+        orden = seleccionar_top_k(valores, top_k)
+        return valores[orden], indices[orden]
+    
+    filas_bloque = max(top_k, BYTES_BLOQUE_L2 // (embeddings_norm.shape[1] * embeddings_norm.itemsize))
+    if len(embeddings_norm) <= filas_bloque:
+        similitudes = calcular_similitudes(embedding_consulta, embeddings_norm)
+        indices_top = seleccionar_top_k(similitudes, top_k)
+        return similitudes[indices_top], indices_top
+    
+    mejores_valores = np.empty(0, dtype=np.float32)
+    mejores_indices = np.empty(0, dtype=np.int64)
+    for inicio in range(0, len(embeddings_norm), filas_bloque):
+        similitudes = calcular_similitudes(embedding_consulta, embeddings_norm[inicio:inicio + filas_bloque])
+        # Los mejores k hasta ahora compiten con los de este bloque
+        seleccion = seleccionar_top_k(similitudes, top_k)
+        valores = np.concatenate([mejores_valores, similitudes[seleccion]])
+        indices = np.concatenate([mejores_indices, seleccion + inicio])
+        orden = seleccionar_top_k(valores, top_k)
+        mejores_valores, mejores_indices = valores[orden], indices[orden]
+    return mejores_valores, mejores_indices
+
+def precompilar_kernels():
+    """Compila los kernels de Numba (si está instalado) para no pagarlo en la primera consulta."""
+    if numba is not None:
+        embeddings = np.zeros((4, 8), dtype=np.float32)
+        _similitudes_numba(embeddings, embeddings[0])
+        _top_k_numba(embeddings, embeddings[0], 2, 1)
+
+def seleccionar_top_k(similitudes, top_k):
+    """
+    Obtiene los índices de las top_k similitudes, de mayor a menor.
+    
+    Usa argpartition (O(N)) y solo ordena los k elementos seleccionados.
+    
+    Args:
+        similitudes: Array (N,) de similitudes
+        top_k: Número de resultados a retornar
+    
+    Returns:
+        Array de índices ordenados por similitud descendente
+    """
+    k = min(top_k, len(similitudes))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidatos = np.argpartition(-similitudes, k - 1)[:k]
+    return candidatos[np.argsort(-similitudes[candidatos])]
+
+def eliminar_si_existe(ruta):
+    """Elimina un archivo generado si existe (p. ej. un índice de una ejecución anterior)."""
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+def ruta_indice_faiss(ruta_embeddings):
+    """Ruta del índice FAISS asociado a un archivo de embeddings."""
+    return ruta_embeddings.replace('_embeddings.npy', '_index.faiss')
+
+def guardar_indice_faiss(embeddings_norm, ruta_embeddings):
+    """
+    Construye y guarda un índice FAISS de producto interno para los embeddings.
+    
+    Para colecciones pequeñas se usa un índice exacto (IndexFlatIP); para
+    colecciones medianas, un grafo HNSW (búsqueda sublineal, recall > 95%);
+    para colecciones grandes, OPQ + IVF-PQ, que ocupa mucha menos memoria.
+    
+    Args:
+        embeddings_norm: Array (N, D) de embeddings normalizados
+        ruta_embeddings: Ruta al archivo .npy de embeddings
+    
+    Returns:
+        Ruta del índice guardado, o None si FAISS no está instalado
+    """
+    if faiss is None:
+        # Un índice de una ejecución anterior ya no corresponde a estos embeddings
+        eliminar_si_existe(ruta_indice_faiss(ruta_embeddings))
+        return None
+    
+    embeddings_norm = np.ascontiguousarray(embeddings_norm, dtype=np.float32)
+    total, dimension = embeddings_norm.shape
+    if total >= MIN_VECTORES_IVFPQ:
+        indice = faiss.index_factory(dimension, "OPQ32,IVF256,PQ32", faiss.METRIC_INNER_PRODUCT)
+        indice.train(embeddings_norm)
+        faiss.extract_index_ivf(indice).nprobe = 16
+    elif total >= MIN_VECTORES_HNSW:
+        indice = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        indice.hnsw.efConstruction = 200
+        indice.hnsw.efSearch = 64
+    else:
+        indice = faiss.IndexFlatIP(dimension)
+    indice.add(embeddings_norm)
+    
+    ruta_indice = ruta_indice_faiss(ruta_embeddings)
+    faiss.write_index(indice, ruta_indice)
+    return ruta_indice
+
+def cargar_indice_faiss(ruta_embeddings, total_embeddings=None):
+    """
+    Carga el índice FAISS asociado a un archivo de embeddings.
+    
+    Args:
+        ruta_embeddings: Ruta al archivo .npy de embeddings
+        total_embeddings: Número de embeddings de la colección (opcional), para
+            descartar un índice que no corresponde a ellos
+    
+    Returns:
+        Índice FAISS, o None si FAISS no está instalado, el índice no existe o no corresponde
+    """
+    ruta_indice = ruta_indice_faiss(ruta_embeddings)
+    if faiss is None or not os.path.exists(ruta_indice):
+        return None
+    indice = faiss.read_index(ruta_indice)
+    if total_embeddings is not None and indice.ntotal != total_embeddings:
+        print(f"Aviso: {ruta_indice} tiene {indice.ntotal} vectores y la colección {total_embeddings}; se usa la búsqueda exacta.")
+        return None
+    return indice
+
+def buscar_en_indice_faiss(indice, embedding_consulta, top_k):
+    """
+    Busca los top_k vecinos de la consulta en un índice FAISS.
+    
+    Args:
+        indice: Índice FAISS de producto interno
+        embedding_consulta: Embedding normalizado de la consulta
+        top_k: Número de resultados a retornar
+    
+    Returns:
+        Tupla (similitudes, indices) ordenada por similitud descendente
+    """
+    consulta = np.ascontiguousarray(embedding_consulta, dtype=np.float32).reshape(1, -1)
+    similitudes, indices = indice.search(consulta, top_k)
+    # FAISS marca con -1 los huecos cuando hay menos de top_k vectores
+    validos = indices[0] >= 0
+    return similitudes[0][validos], indices[0][validos]
+
+def calcular_firmas_binarias(embeddings):
+    """
+    Convierte embeddings en firmas binarias (1 bit por dimensión, signo del valor).
+    
+    Args:
+        embeddings: Array (N, D) o (D,) de embeddings
+    
+    Returns:
+        Array uint8 (N, D/8) con los bits empaquetados
+    """
+    embeddings = np.atleast_2d(embeddings)
+    return np.packbits(embeddings > 0, axis=1)
+
+def ruta_firmas_binarias(ruta_embeddings):
+    """Ruta del archivo de firmas binarias asociado a un archivo de embeddings."""
+    return ruta_embeddings.replace('_embeddings.npy', '_bits.npy')
+
+def guardar_firmas_binarias(embeddings_norm, ruta_embeddings):
+    """
+    Guarda las firmas binarias de la colección si es lo bastante grande.
+    
+    Args:
+        embeddings_norm: Array (N, D) de embeddings normalizados
+        ruta_embeddings: Ruta al archivo .npy de embeddings
+    
+    Returns:
+        Ruta de las firmas guardadas, o None si la colección es pequeña
+    """
+    if len(embeddings_norm) < MIN_VECTORES_BINARIO:
+        # Unas firmas de una ejecución anterior ya no corresponden a estos embeddings
+        eliminar_si_existe(ruta_firmas_binarias(ruta_embeddings))
+        return None
+    ruta_firmas = ruta_firmas_binarias(ruta_embeddings)
+    np.save(ruta_firmas, calcular_firmas_binarias(embeddings_norm))
+    return ruta_firmas
+
+def cargar_firmas_binarias(ruta_embeddings, total_embeddings=None):
+    """
+    Carga las firmas binarias de la colección.
+    
+    Args:
+        ruta_embeddings: Ruta al archivo .npy de embeddings
+        total_embeddings: Número de embeddings de la colección (opcional), para
+            descartar unas firmas que no corresponden a ellos
+    
+    Returns:
+        Firmas binarias, o None si no existen o no corresponden
+    """
+    ruta_firmas = ruta_firmas_binarias(ruta_embeddings)
+    if not os.path.exists(ruta_firmas):
+        return None
+    firmas = np.load(ruta_firmas)
+    if total_embeddings is not None and len(firmas) != total_embeddings:
+        print(f"Aviso: {ruta_firmas} tiene {len(firmas)} firmas y la colección {total_embeddings}; se usa la búsqueda exacta.")
+        return None
+    return firmas
+
+def buscar_con_firmas(embedding_consulta, embeddings_norm, firmas, top_k, n_candidatos=CANDIDATOS_HAMMING):
+    """
+    Búsqueda en dos etapas: ranking por distancia de Hamming y reordenación exacta.
+    
+    Args:
+        embedding_consulta: Embedding normalizado de la consulta
+        embeddings_norm: Array (N, D) de embeddings normalizados
+        firmas: Firmas binarias de la colección (ver calcular_firmas_binarias)
+        top_k: Número de resultados a retornar
+        n_candidatos: Candidatos de la primera etapa que se reordenan con coseno
+    
+    Returns:
+        Tupla (similitudes, indices) ordenada por similitud descendente
+    """
+    consulta = np.ascontiguousarray(embedding_consulta, dtype=np.float32).reshape(-1)
+    
+    # Etapa 1: XOR + popcount contra todas las firmas
+    distancias = _POPCOUNT_BYTE[np.bitwise_xor(firmas, calcular_firmas_binarias(consulta))].sum(axis=1)
+    n_candidatos = min(max(n_candidatos, top_k), len(distancias))
+    candidatos = np.argpartition(distancias, n_candidatos - 1)[:n_candidatos]
+    
+    # Etapa 2: coseno exacto solo sobre los candidatos
+    similitudes = embeddings_norm[candidatos] @ consulta
+    orden = seleccionar_top_k(similitudes, top_k)
+    return similitudes[orden], candidatos[orden]
+
+def cuantizar_int8(embeddings):
+    """
+    Cuantiza embeddings a int8 con una escala por vector (simétrica).
+    
+    Args:
+        embeddings: Array (N, D) o (D,) de embeddings
+    
+    Returns:
+        Tupla (embeddings_int8, escalas): int8 (N, D) y float32 (N,), con
+        embeddings ≈ embeddings_int8 * escalas[:, None]
+    """
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    escalas = np.maximum(np.abs(embeddings).max(axis=1), 1e-12) / 127.0
+    embeddings_int8 = np.round(embeddings / escalas[:, None]).astype(np.int8)
+    return embeddings_int8, escalas.astype(np.float32)
+
+def guardar_embeddings_int8(embeddings_norm, ruta_embeddings):
+    """
+    Guarda la versión int8 de los embeddings (*_int8.npy) y sus escalas (*_int8_scale.npy).
+    Solo se guarda con SimSIMD instalado, que es quien la lee (ver cargar_embeddings_int8).
+    
+    Args:
+        embeddings_norm: Array (N, D) de embeddings normalizados
+        ruta_embeddings: Ruta al archivo .npy de embeddings
+    
+    Returns:
+        Ruta del archivo int8 guardado, o None si SimSIMD no está instalado
+    """
+    ruta_int8 = ruta_embeddings.replace('.npy', '_int8.npy')
+    ruta_escalas = ruta_embeddings.replace('.npy', '_int8_scale.npy')
+    if simsimd is None:
+        # Una copia de una ejecución anterior ya no corresponde a estos embeddings
+        eliminar_si_existe(ruta_int8)
+        eliminar_si_existe(ruta_escalas)
+        return None
+    
+    embeddings_int8, escalas = cuantizar_int8(embeddings_norm)
+    np.save(ruta_int8, embeddings_int8)
+    np.save(ruta_escalas, escalas)
+    return ruta_int8
+
+def cargar_embeddings_int8(ruta_embeddings):
+    """
+    Carga los embeddings int8 (mapeados en memoria) y sus escalas.
+    
+    Solo tiene sentido con SimSIMD, que tiene kernels int8 (NumPy no).
+    
+    Returns:
+        Tupla (embeddings_int8, escalas), o (None, None) si no existen o SimSIMD no está instalado
+    """
+    ruta_int8 = ruta_embeddings.replace('.npy', '_int8.npy')
+    if simsimd is None or not os.path.exists(ruta_int8):
+        return None, None
+    escalas = np.load(ruta_embeddings.replace('.npy', '_int8_scale.npy'))
+    return np.load(ruta_int8, mmap_mode='r'), escalas
+
+def buscar_int8(embedding_consulta, embeddings_int8, escalas, embeddings_norm, top_k, n_candidatos=CANDIDATOS_INT8):
+    """
+    Búsqueda aproximada con el kernel de producto punto int8 de SimSIMD y reordenación exacta.
+    
+    El producto punto se calcula sobre los valores int8 (4 veces menos memoria
+    que float32, instrucciones VNNI/sdot) y se reescala con escala_consulta * escalas.
+    
+    Args:
+        embedding_consulta: Embedding normalizado de la consulta
+        embeddings_int8: Array int8 (N, D) de la colección (ver cuantizar_int8)
+        escalas: Array (N,) con la escala de cada vector int8
+        embeddings_norm: Array (N, D) de embeddings normalizados, para reordenar
+        top_k: Número de resultados a retornar
+        n_candidatos: Candidatos de la búsqueda int8 que se reordenan en float
+    
+    Returns:
+        Tupla (similitudes, indices) ordenada por similitud descendente
+    """
+    consulta_int8, escala_consulta = cuantizar_int8(embedding_consulta)
+    productos = np.asarray(simsimd.cdist(consulta_int8, embeddings_int8, metric="dot"), dtype=np.float32).ravel()
+    similitudes_int8 = productos * (escala_consulta[0] * escalas)
+    candidatos = seleccionar_top_k(similitudes_int8, max(n_candidatos, top_k))
+    
+    # Reordenar los candidatos con los embeddings en float
+    similitudes = calcular_similitudes(embedding_consulta, embeddings_norm[candidatos])
+    orden = seleccionar_top_k(similitudes, top_k)
+    return similitudes[orden], candidatos[orden]